@@ -0,0 +1,144 @@
+"""Run a directory of scheduling scenarios without prompts.
+
+Each scenario is a JSON file such as::
+
+    {
+        "periods": ["01/01/2025-31/03/2025"],
+        "holidays": ["06/01/2025"],
+        "jobs": ["A", "B", "C"],
+        "min_distance": 4,
+        "max_shifts_per_week": 2,
+        "workers_csv": "cardiology.csv",
+        "exports": ["csv", "ics"]
+    }
+
+workers_csv is relative to the scenario file. Scenarios run concurrently
+in a process pool and each one gets an output directory named after its
+file, holding the exports and a result.json with the score and timings;
+summary.json lists every scenario. A file that is not valid JSON or
+lacks a field fails alone with status "error", like a scenario that
+fails to run.
+"""
+import argparse
+import copy
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import nullcontext
+
+from instrumentation import profiling
+from shift_scheduler import import_workers_from_csv, schedule_shifts
+from multistart import score_schedule
+
+EXPORT_FILENAMES = {
+    'csv': 'schedule.csv',
+    'pdf': 'schedule.pdf',
+    'ics': 'schedule.ics',
+    'ics_dir': 'feeds',
+    'stats': 'statistics.json'
+}
+
+# Rosters parsed by this process, keyed by path and modification time
+_rosters = {}
+
+def scenario_name(filename):
+    return os.path.splitext(os.path.basename(filename))[0]
+
+def load_scenario(filename):
+    with open(filename) as file:
+        scenario = json.load(file)
+    scenario['name'] = scenario_name(filename)
+    scenario['workers_csv'] = os.path.join(os.path.dirname(os.path.abspath(filename)), scenario['workers_csv'])
+    return scenario
+
+def load_roster(path):
+    """Workers of a roster CSV, parsed once per process; every call gets fresh copies."""
+    key = (path, os.path.getmtime(path))
+    if key not in _rosters:
+        _rosters[key] = import_workers_from_csv(path)
+    return copy.deepcopy(_rosters[key])
+
+def run_scenario(scenario, output_dir, profile=False, pstats=False):
+    # cli only imports the exporters a scenario asks for
+    from cli import export
+
+    result = {'name': scenario['name'], 'status': 'ok'}
+    timings = result['seconds'] = {}
+    scenario_dir = os.path.join(output_dir, scenario['name'])
+    # With profile, the phases of the run go to profile.json (and .pstats dumps) in the scenario's output directory
+    with profiling(scenario_dir, cprofile=pstats) if profile else nullcontext():
+        try:
+            start = time.perf_counter()
+            workers = load_roster(scenario['workers_csv'])
+            timings['load'] = time.perf_counter() - start
+
+            start = time.perf_counter()
+            schedule = schedule_shifts(scenario['periods'], scenario.get('holidays', []), scenario['jobs'], workers,
+                                       scenario.get('min_distance', 4), scenario.get('max_shifts_per_week', 2))
+            timings['schedule'] = time.perf_counter() - start
+            result['score'] = score_schedule(schedule, workers, scenario['periods'])
+
+            start = time.perf_counter()
+            os.makedirs(scenario_dir, exist_ok=True)
+            for output_format in scenario.get('exports', ['csv']):
+                export(schedule, output_format, os.path.join(scenario_dir, EXPORT_FILENAMES[output_format]))
+            timings['export'] = time.perf_counter() - start
+        except Exception as e:
+            result['status'] = 'error'
+            result['error'] = f"{type(e).__name__}: {e}"
+    return write_result(result, output_dir)
+
+def write_result(result, output_dir):
+    scenario_dir = os.path.join(output_dir, result['name'])
+    os.makedirs(scenario_dir, exist_ok=True)
+    with open(os.path.join(scenario_dir, 'result.json'), 'w') as file:
+        json.dump(result, file, indent=2, sort_keys=True)
+    return result
+
+def run_batch(scenario_dir, output_dir, processes=None, profile=False, pstats=False):
+    """Run every *.json scenario in scenario_dir and return their results in file order."""
+    filenames = sorted(os.path.join(scenario_dir, name) for name in os.listdir(scenario_dir) if name.endswith('.json'))
+    os.makedirs(output_dir, exist_ok=True)
+    # A file that cannot be read as a scenario fails on its own, like a scenario that fails to run
+    scenarios, results = {}, {}
+    for index, filename in enumerate(filenames):
+        try:
+            scenarios[index] = load_scenario(filename)
+        except Exception as e:
+            results[index] = write_result({'name': scenario_name(filename), 'status': 'error', 'error': f"{type(e).__name__}: {e}"}, output_dir)
+    processes = min(processes or os.cpu_count() or 1, len(scenarios))
+
+    if processes <= 1:
+        for index, scenario in scenarios.items():
+            results[index] = run_scenario(scenario, output_dir, profile, pstats)
+    else:
+        # Scenarios sharing a roster are submitted next to each other so they tend to land on a process that already parsed it
+        order = sorted(scenarios, key=lambda index: scenarios[index]['workers_csv'])
+        with ProcessPoolExecutor(max_workers=processes) as executor:
+            futures = {index: executor.submit(run_scenario, scenarios[index], output_dir, profile, pstats) for index in order}
+            results.update((index, future.result()) for index, future in futures.items())
+    results = [results[index] for index in range(len(filenames))]
+
+    with open(os.path.join(output_dir, 'summary.json'), 'w') as file:
+        json.dump(results, file, indent=2, sort_keys=True)
+    return results
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='batch_runner.py', description='Run every scenario file in a directory.')
+    parser.add_argument('scenario_dir')
+    parser.add_argument('output_dir')
+    parser.add_argument('--processes', type=int, help='Size of the process pool (default: one per CPU)')
+    parser.add_argument('--profile', action='store_true', help="Save each scenario's per-phase profile.json next to its outputs")
+    parser.add_argument('--pstats', action='store_true', help='With --profile, also save a cProfile dump per phase')
+    args = parser.parse_args(sys.argv[1:] if argv is None else argv)
+
+    results = run_batch(args.scenario_dir, args.output_dir, args.processes, args.profile, args.pstats)
+    for result in results:
+        detail = result.get('error') or f"{result['seconds']['schedule']:.3f}s, {result['score']['unfilled_slots']} unfilled"
+        print(f"{result['name']}: {result['status']} ({detail})")
+    return 1 if any(result['status'] != 'ok' for result in results) else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
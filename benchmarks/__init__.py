@@ -0,0 +1,4 @@
+"""Synthetic rosters and timing harness for the scheduler and exporters.
+
+Run ``python -m benchmarks --help`` from the repository root.
+"""
@@ -0,0 +1,123 @@
+import csv
+import random
+from datetime import datetime, timedelta
+
+from shift_scheduler import Worker
+
+CSV_HEADERS = ['Identification', 'Work Dates', 'Percentage', 'Group', 'Incompatible Job', 'Group Incompatibility',
+               'Obligatory Coverage', 'Unavailable Dates', 'Assigned Shifts', 'Assigned Jobs']
+
+class RosterSpec:
+    """Scale knobs for a synthetic scheduling input. Same spec and seed, same roster."""
+    def __init__(self, workers=100, jobs=3, days=90, start_date=datetime(2025, 1, 1), holiday_density=0.03,
+                 part_time_share=0.2, groups=3, incompatible_share=0.1, obligatory_per_worker=1,
+                 unavailable_per_worker=3, partial_availability_share=0.1, history_shifts=0,
+                 min_distance=3, max_shifts_per_week=2, seed=0):
+        self.workers = workers
+        self.jobs = jobs
+        self.days = days
+        self.start_date = start_date
+        self.holiday_density = holiday_density
+        self.part_time_share = part_time_share
+        self.groups = groups
+        self.incompatible_share = incompatible_share
+        self.obligatory_per_worker = obligatory_per_worker
+        self.unavailable_per_worker = unavailable_per_worker
+        self.partial_availability_share = partial_availability_share
+        self.history_shifts = history_shifts
+        self.min_distance = min_distance
+        self.max_shifts_per_week = max_shifts_per_week
+        self.seed = seed
+
+    def as_dict(self):
+        values = dict(vars(self))
+        values['start_date'] = self.start_date.strftime("%d/%m/%Y")
+        return values
+
+class SyntheticRoster:
+    """Plain-data description of a generated roster; workers() builds fresh Worker objects from it."""
+    def __init__(self, spec, work_periods, holidays, jobs, worker_rows):
+        self.spec = spec
+        self.work_periods = work_periods
+        self.holidays = holidays
+        self.jobs = jobs
+        self.worker_rows = worker_rows
+
+    def workers(self):
+        # schedule_shifts mutates its workers (quota, work_dates), so every run needs new ones
+        return [Worker(
+            identification=row['identification'],
+            work_dates=list(row['work_dates']),
+            percentage=row['percentage'],
+            group=row['group'],
+            incompatible_job=list(row['incompatible_job']),
+            group_incompatibility=list(row['group_incompatibility']),
+            obligatory_coverage=list(row['obligatory_coverage']),
+            unavailable_dates=list(row['unavailable_dates']),
+            previously_assigned_shifts=list(row['previously_assigned_shifts'])
+        ) for row in self.worker_rows]
+
+    def schedule_args(self):
+        return (self.work_periods, self.holidays, self.jobs, self.workers(), self.spec.min_distance, self.spec.max_shifts_per_week)
+
+    def write_csv(self, filename):
+        """Write the roster in the format import_workers_from_csv reads."""
+        with open(filename, mode='w', newline='') as file:
+            writer = csv.writer(file)
+            writer.writerow(CSV_HEADERS)
+            for row in self.worker_rows:
+                writer.writerow([
+                    row['identification'],
+                    ','.join(f"{start.strftime('%d/%m/%Y')}-{end.strftime('%d/%m/%Y')}" for start, end in row['work_dates']),
+                    row['percentage'],
+                    row['group'],
+                    ','.join(row['incompatible_job']),
+                    ','.join(row['group_incompatibility']),
+                    ','.join(row['obligatory_coverage']),
+                    ','.join(row['unavailable_dates']),
+                    ','.join(date.strftime('%d/%m/%Y') for date, _ in row['previously_assigned_shifts']),
+                    ','.join(job for _, job in row['previously_assigned_shifts'])
+                ])
+
+def generate_roster(spec):
+    rng = random.Random(spec.seed)
+    start_date = spec.start_date
+    end_date = start_date + timedelta(days=spec.days - 1)
+    days = [start_date + timedelta(n) for n in range(spec.days)]
+    jobs = [chr(ord('A') + n) if n < 26 else f"J{n}" for n in range(spec.jobs)]
+    groups = [str(n + 1) for n in range(max(spec.groups, 1))]
+
+    def random_dates(count):
+        return sorted({rng.choice(days).strftime("%d/%m/%Y") for _ in range(count)})
+
+    worker_rows = []
+    for n in range(spec.workers):
+        if rng.random() < spec.partial_availability_share:
+            first = rng.randrange(spec.days)
+            last = min(spec.days - 1, first + rng.randrange(7, max(spec.days, 8)))
+            work_dates = [(days[first], days[last])]
+        else:
+            # Empty work dates make the scheduler use the whole run
+            work_dates = []
+        group = rng.choice(groups)
+        group_incompatibility = []
+        if len(groups) > 1 and rng.random() < spec.incompatible_share:
+            group_incompatibility = [rng.choice([other for other in groups if other != group])]
+        history = []
+        for k in range(spec.history_shifts):
+            history.append((start_date - timedelta(days=spec.min_distance * (spec.history_shifts - k) + rng.randrange(3)), rng.choice(jobs)))
+        worker_rows.append({
+            'identification': f"W{n + 1}",
+            'work_dates': work_dates,
+            'percentage': rng.choice((50.0, 75.0)) if rng.random() < spec.part_time_share else 100.0,
+            'group': group,
+            'incompatible_job': [],
+            'group_incompatibility': group_incompatibility,
+            'obligatory_coverage': random_dates(spec.obligatory_per_worker),
+            'unavailable_dates': random_dates(spec.unavailable_per_worker),
+            'previously_assigned_shifts': history
+        })
+
+    holidays = [day.strftime("%d/%m/%Y") for day in days if rng.random() < spec.holiday_density]
+    work_periods = [f"{start_date.strftime('%d/%m/%Y')}-{end_date.strftime('%d/%m/%Y')}"]
+    return SyntheticRoster(spec, work_periods, holidays, jobs, worker_rows)
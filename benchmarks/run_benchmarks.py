@@ -0,0 +1,118 @@
+import argparse
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+
+from benchmarks.roster_generator import RosterSpec, generate_roster
+from shift_scheduler import schedule_shifts, import_workers_from_csv, prepare_breakdown, export_schedule_to_csv
+from schedule_stats import schedule_statistics
+
+def measure(setup, target, repeat):
+    """Time target(*setup()) repeat times, then run it once more under tracemalloc for the peak."""
+    timings = []
+    for _ in range(repeat):
+        args = setup()
+        start = time.perf_counter()
+        target(*args)
+        timings.append(time.perf_counter() - start)
+    args = setup()
+    tracemalloc.start()
+    try:
+        target(*args)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return {
+        'seconds_min': min(timings),
+        'seconds_median': statistics.median(timings),
+        'seconds_max': max(timings),
+        'repeat': repeat,
+        'peak_memory_bytes': peak
+    }
+
+def run_benchmarks(spec, repeat=3, only=None, workdir=None):
+    roster = generate_roster(spec)
+    workdir = workdir or tempfile.mkdtemp(prefix='shift_benchmarks_')
+    csv_path = os.path.join(workdir, 'workers.csv')
+    roster.write_csv(csv_path)
+    schedule = schedule_shifts(*roster.schedule_args())
+
+    def export_pdf(schedule, filename):
+        # fpdf is only needed for this benchmark
+        from pdf_exporter import export_schedule_to_pdf
+        export_schedule_to_pdf(schedule, filename)
+
+    benchmarks = {
+        'schedule_shifts': (roster.schedule_args, schedule_shifts),
+        'import_workers_from_csv': (lambda: (csv_path,), import_workers_from_csv),
+        'prepare_breakdown': (lambda: (schedule,), prepare_breakdown),
+        'schedule_statistics': (lambda: (schedule,), schedule_statistics),
+        'export_schedule_to_csv': (lambda: (schedule, os.path.join(workdir, 'schedule.csv')), export_schedule_to_csv),
+        'export_schedule_to_pdf': (lambda: (schedule, os.path.join(workdir, 'schedule.pdf')), export_pdf)
+    }
+    results = []
+    for name, (setup, target) in benchmarks.items():
+        if only and name not in only:
+            continue
+        result = {'benchmark': name}
+        try:
+            result.update(measure(setup, target, repeat))
+        except ImportError as e:
+            result['skipped'] = str(e)
+        results.append(result)
+    return results
+
+def environment():
+    return {
+        'timestamp': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count()
+    }
+
+def parse_args(argv):
+    defaults = RosterSpec()
+    parser = argparse.ArgumentParser(prog='python -m benchmarks', description='Benchmark the scheduler and exporters on a synthetic roster.')
+    parser.add_argument('--workers', type=int, default=defaults.workers)
+    parser.add_argument('--jobs', type=int, default=defaults.jobs)
+    parser.add_argument('--days', type=int, default=defaults.days, help='Length of the scheduling horizon')
+    parser.add_argument('--holiday-density', type=float, default=defaults.holiday_density, help='Share of days that are holidays')
+    parser.add_argument('--part-time-share', type=float, default=defaults.part_time_share, help='Share of workers below 100%% percentage_shifts')
+    parser.add_argument('--groups', type=int, default=defaults.groups, help='Number of worker groups')
+    parser.add_argument('--incompatible-share', type=float, default=defaults.incompatible_share, help='Share of workers with a group incompatibility')
+    parser.add_argument('--obligatory-per-worker', type=int, default=defaults.obligatory_per_worker)
+    parser.add_argument('--unavailable-per-worker', type=int, default=defaults.unavailable_per_worker)
+    parser.add_argument('--history-shifts', type=int, default=defaults.history_shifts, help='Previously assigned shifts per worker')
+    parser.add_argument('--min-distance', type=int, default=defaults.min_distance)
+    parser.add_argument('--max-shifts-per-week', type=int, default=defaults.max_shifts_per_week)
+    parser.add_argument('--seed', type=int, default=defaults.seed)
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--only', action='append', help='Run only this benchmark (repeatable)')
+    parser.add_argument('--output', help='Append results as JSON lines to this file instead of printing them')
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    args = parse_args(sys.argv[1:] if argv is None else argv)
+    spec = RosterSpec(
+        workers=args.workers, jobs=args.jobs, days=args.days, holiday_density=args.holiday_density,
+        part_time_share=args.part_time_share, groups=args.groups, incompatible_share=args.incompatible_share,
+        obligatory_per_worker=args.obligatory_per_worker, unavailable_per_worker=args.unavailable_per_worker,
+        history_shifts=args.history_shifts, min_distance=args.min_distance,
+        max_shifts_per_week=args.max_shifts_per_week, seed=args.seed
+    )
+    run = {'environment': environment(), 'spec': spec.as_dict()}
+    lines = [json.dumps(dict(run, **result), sort_keys=True) for result in run_benchmarks(spec, args.repeat, args.only)]
+    if args.output:
+        with open(args.output, 'a') as file:
+            file.writelines(line + '\n' for line in lines)
+    else:
+        print('\n'.join(lines))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,244 @@
+import time
+
+import numpy as np
+
+from instrumentation import instrumentation
+
+# The 7/14/21/28-day rule never looks further than four weeks from a shift
+CYCLE_DAYS = 28
+
+class Constraint:
+    """One scheduling rule, checked for many workers on a (day, job) slot at once.
+
+    Subclasses set a name, say whether the rule is hard (it also binds the
+    override fallback, which otherwise only needs quota and availability)
+    and give a rough relative cost used to order rules before any timing is
+    known. compile() runs once per scheduling run. rejects() gets the roster
+    rows to check, either every row (a slice) or an index array of the rows
+    still in the running, and returns a boolean array over them, True where
+    the rule rules the worker out, or None when it rules out nobody.
+    A lookback rule only compares the slot with the worker's latest shift,
+    which holds while the forward pass fills days in order; repair refills
+    and local search moves skip such rules and check the shifts on both
+    sides of the slot themselves.
+    """
+    name = None
+    hard = False
+    lookback = False
+    cost = 1
+
+    def compile(self, state):
+        pass
+
+    def rejects(self, state, rows, offset, job_row):
+        raise NotImplementedError
+
+class QuotaLeft(Constraint):
+    name = 'no_quota'
+    hard = True
+
+    def rejects(self, state, rows, offset, job_row):
+        return state.roster_arrays.shift_quota[rows] <= 0
+
+class Unavailable(Constraint):
+    name = 'unavailable'
+    hard = True
+
+    def rejects(self, state, rows, offset, job_row):
+        return state.availability.unavailable[rows, offset]
+
+class IncompatibleJob(Constraint):
+    name = 'incompatible_job'
+    hard = True
+
+    def compile(self, state):
+        self.matrix = np.zeros((len(state.jobs), len(state.workers)), dtype=bool)
+        for row, worker in enumerate(state.workers):
+            for job_row, job in enumerate(state.jobs):
+                self.matrix[job_row, row] = worker.is_incompatible_with(job)
+        self.any_job = self.matrix.any(axis=1)
+
+    def rejects(self, state, rows, offset, job_row):
+        if not self.any_job[job_row]:
+            return None
+        return self.matrix[job_row, rows]
+
+class OutsideWorkDates(Constraint):
+    name = 'outside_work_dates'
+
+    def rejects(self, state, rows, offset, job_row):
+        return ~state.availability.in_work_period[rows, offset]
+
+class MinDistance(Constraint):
+    name = 'min_distance'
+    lookback = True
+    cost = 2
+
+    def compile(self, state):
+        # Adjust the minimum distance for workers performing less than 100% of shifts
+        self.adjusted_min_distance = state.min_distance * 100 / state.roster_arrays.percentage_shifts
+
+    def rejects(self, state, rows, offset, job_row):
+        arrays = state.roster_arrays
+        return arrays.has_last_shift[rows] & (offset - arrays.last_shift[rows] < self.adjusted_min_distance[rows])
+
+class WeekdayCycle(Constraint):
+    name = 'weekday_cycle'
+    lookback = True
+    cost = 2
+
+    def rejects(self, state, rows, offset, job_row):
+        # Gaps of 7, 14, 21 and 28 days; the last shift may lie anywhere, even outside the horizon
+        arrays = state.roster_arrays
+        gap = offset - arrays.last_shift[rows]
+        return arrays.has_last_shift[rows] & (gap % 7 == 0) & (gap >= 7) & (gap <= CYCLE_DAYS)
+
+class JobRepetition(Constraint):
+    name = 'job_repetition'
+    lookback = True
+    cost = 2
+
+    def rejects(self, state, rows, offset, job_row):
+        arrays = state.roster_arrays
+        return arrays.has_last_shift[rows] & (arrays.job_counts[rows, job_row] > 0) & (offset - arrays.last_shift[rows] == 1)
+
+class WeeklyLimit(Constraint):
+    name = 'weekly_limit'
+
+    def rejects(self, state, rows, offset, job_row):
+        return state.roster_arrays.weekly_counts[rows, state.horizon.week_indices[offset]] >= state.max_shifts_per_week
+
+class WeekendLimit(Constraint):
+    name = 'weekend_limit'
+
+    def rejects(self, state, rows, offset, job_row):
+        if not state.horizon.weekend_or_holiday[offset]:
+            return None
+        return state.roster_arrays.weekend_counts[rows] >= 4
+
+class GroupIncompatibility(Constraint):
+    name = 'group_incompatibility'
+    cost = 3
+
+    def compile(self, state):
+        self.any_incompatibility = bool(state.group_occupancy.incompatibility_matrix.any())
+
+    def rejects(self, state, rows, offset, job_row):
+        if not self.any_incompatibility:
+            return None
+        occupancy = state.group_occupancy
+        on_shift = occupancy.counts[offset] > 0
+        if not on_shift.any():
+            return None
+        return occupancy.incompatibility_matrix[rows][:, on_shift].any(axis=1)
+
+def default_constraints():
+    return [QuotaLeft(), Unavailable(), IncompatibleJob(), OutsideWorkDates(), MinDistance(), WeekdayCycle(),
+            JobRepetition(), WeeklyLimit(), WeekendLimit(), GroupIncompatibility()]
+
+class ConstraintEngine:
+    """Checks a slot against a list of constraints, cheapest and most selective first.
+
+    The check stops as soon as nobody is left, and once only a few workers
+    remain the later constraints are checked for those rows alone; on small
+    rosters whole-array checks are cheaper than indexing. On one slot in sample_every the
+    engine times every constraint and counts what it rejects, and every
+    reorder_every slots it re-sorts the rules by seconds per worker checked
+    over the share of workers rejected.
+    Hard constraints always run before the others so the override mask
+    comes out of the same pass.
+    """
+    # Switch from whole-roster checks to index arrays once fewer than 1 in INDEX_BELOW workers remain
+    INDEX_BELOW = 8
+
+    def __init__(self, constraints, reorder_every=128, sample_every=8):
+        self.constraints = list(constraints)
+        self.reorder_every = reorder_every
+        self.sample_every = sample_every
+        self.hard = sorted((constraint for constraint in self.constraints if constraint.hard), key=lambda constraint: constraint.cost)
+        self.soft = sorted((constraint for constraint in self.constraints if not constraint.hard), key=lambda constraint: constraint.cost)
+        self.checked = {constraint.name: 0 for constraint in self.constraints}
+        self.rejected = {constraint.name: 0 for constraint in self.constraints}
+        self.seconds = {constraint.name: 0.0 for constraint in self.constraints}
+        self.slots = 0
+
+    def compile(self, state):
+        self.num_rows = len(state.workers)
+        self.every_row = np.ones(self.num_rows, dtype=bool)
+        for constraint in self.constraints:
+            constraint.compile(state)
+
+    def _filter(self, constraints, state, alive, count, offset, job_row, sampled):
+        """Narrow the boolean alive mask of count workers with each constraint in turn; returns the new mask and count."""
+        rows = slice(None)
+        for constraint in constraints:
+            if not count:
+                break
+            if isinstance(rows, slice) and count * self.INDEX_BELOW <= self.num_rows:
+                rows = np.flatnonzero(alive)
+            if sampled:
+                start = time.perf_counter()
+                rejected = constraint.rejects(state, rows, offset, job_row)
+                self.seconds[constraint.name] += time.perf_counter() - start
+                self.checked[constraint.name] += count
+            else:
+                rejected = constraint.rejects(state, rows, offset, job_row)
+            if rejected is None:
+                continue
+            if isinstance(rows, slice):
+                # Workers already out may be rejected again; only newly rejected ones count
+                alive = alive & ~rejected
+                removed = count - int(np.count_nonzero(alive))
+            else:
+                removed = int(np.count_nonzero(rejected))
+                if removed:
+                    alive = alive.copy()
+                    alive[rows[rejected]] = False
+                    rows = rows[~rejected]
+            count -= removed
+            if sampled:
+                self.rejected[constraint.name] += removed
+            if instrumentation.enabled and removed:
+                instrumentation.reject(constraint.name, removed)
+        return alive, count
+
+    def masks(self, state, offset, job_row):
+        """Return (strict, override) boolean arrays over the roster rows for one slot."""
+        sampled = self.slots % self.sample_every == 0
+        override, count = self._filter(self.hard, state, self.every_row, self.num_rows, offset, job_row, sampled)
+        strict, _ = self._filter(self.soft, state, override, count, offset, job_row, sampled)
+
+        self.slots += 1
+        if self.slots % self.reorder_every == 0:
+            self.reorder()
+        return strict, override
+
+    def placement_masks(self, state, offset, job_row):
+        """Like masks(), without the lookback rules, for a slot between a worker's existing shifts.
+
+        Nothing is sampled, so these checks leave the evaluation order alone.
+        """
+        override, count = self._filter([constraint for constraint in self.hard if not constraint.lookback], state,
+                                       self.every_row, self.num_rows, offset, job_row, False)
+        strict, _ = self._filter([constraint for constraint in self.soft if not constraint.lookback], state,
+                                 override, count, offset, job_row, False)
+        return strict, override
+
+    def rank(self, constraint):
+        checked = self.checked[constraint.name]
+        if not checked:
+            return 0.0  # Never measured yet; try it early to learn its numbers
+        rejection_rate = max(self.rejected[constraint.name] / checked, 1e-3)
+        return self.seconds[constraint.name] / checked / rejection_rate
+
+    def reorder(self):
+        self.hard.sort(key=self.rank)
+        self.soft.sort(key=self.rank)
+
+    def stats(self):
+        """Per constraint: sampled workers checked and rejected and seconds spent, in current evaluation order."""
+        return [
+            {'name': constraint.name, 'hard': constraint.hard, 'checked': self.checked[constraint.name],
+             'rejected': self.rejected[constraint.name], 'seconds': self.seconds[constraint.name]}
+            for constraint in self.hard + self.soft
+        ]
@@ -1,15 +1,18 @@
 import sys
+import threading
 from datetime import datetime
 from PySide6.QtWidgets import (
     QTableWidget, QTableWidgetItem, QApplication, QMainWindow, QLabel, QVBoxLayout, QWidget,
-    QLineEdit, QPushButton, QTextEdit, QFileDialog, QGridLayout, QScrollArea
+    QLineEdit, QPushButton, QTextEdit, QFileDialog, QTableView, QProgressBar, QMessageBox
 )
 
+from PySide6.QtCore import QObject, QRunnable, QThreadPool, Signal, Qt, QAbstractTableModel, QModelIndex
+import copy
 from PySide6.QtGui import QAction
-from worker import Worker
-from shift_scheduler import import_workers_from_csv, schedule_shifts, prepare_breakdown, export_breakdown, export_schedule_to_csv
-from icalendar import Calendar, Event
+from shift_scheduler import Worker, SchedulingCancelled, parse_work_periods, import_workers_from_csv, schedule_shifts, prepare_breakdown, export_schedule_to_csv
+from ics_exporter import export_schedule_to_ics
 from pdf_exporter import export_schedule_to_pdf
+from schedule_stats import schedule_statistics
 from reportlab.lib.pagesizes import letter
 from reportlab.pdfgen import canvas
 
@@ -39,7 +42,132 @@ class ScheduleOutputWindow(QMainWindow):
             for date, worker in shifts.items():
                 output += f"  {date}: {worker}\n"
         return output
-        
+
+class ScheduleSignals(QObject):
+    progress = Signal(int, int)
+    finished = Signal(object)
+    failed = Signal(str)
+    cancelled = Signal()
+
+class ScheduleTask(QRunnable):
+    """Runs schedule_shifts on a QThreadPool thread and reports back through signals."""
+    def __init__(self, *args):
+        super().__init__()
+        self.setAutoDelete(False)
+        self.args = args
+        self.signals = ScheduleSignals()
+        self.cancel_event = threading.Event()
+
+    def cancel(self):
+        self.cancel_event.set()
+
+    def run(self):
+        try:
+            schedule = schedule_shifts(*self.args, progress=self.signals.progress.emit, cancelled=self.cancel_event.is_set)
+        except SchedulingCancelled:
+            self.signals.cancelled.emit()
+        except Exception as e:
+            self.signals.failed.emit(str(e))
+        else:
+            self.signals.finished.emit(schedule)
+
+def format_dates(dates):
+    return ','.join(date.strftime('%d/%m/%Y') if isinstance(date, datetime) else date.strip() for date in dates if date)
+
+def split_list(text):
+    return [item.strip() for item in text.split(',') if item.strip()]
+
+class WorkerTableModel(QAbstractTableModel):
+    """Table model over a list of Worker objects, one row per worker.
+
+    Cells are formatted only when the view asks for them, so the table
+    costs the same to load for ten workers as for thousands.
+    """
+    COLUMNS = [
+        ("Identificación", lambda worker: worker.identification),
+        ("Cuando trabaja", lambda worker: ','.join(f"{start.strftime('%d/%m/%Y')}-{end.strftime('%d/%m/%Y')}" for start, end in worker.work_dates)),
+        ("Porcentaje de jornada", lambda worker: f"{worker.percentage_shifts:g}"),
+        ("Grupo", lambda worker: worker.group),
+        ("No trabaja Rosell", lambda worker: ','.join(job for job in worker.incompatible_job if job)),
+        ("Incompatibilidad con grupo", lambda worker: ','.join(group for group in worker.group_incompatibility if group)),
+        ("Guardias obligatorias", lambda worker: format_dates(worker.obligatory_coverage)),
+        ("Guardias No disponible", lambda worker: format_dates(worker.unavailable_dates))
+    ]
+
+    def __init__(self, workers=None, parent=None):
+        super().__init__(parent)
+        self.workers = list(workers or [])
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.workers)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.COLUMNS)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid() or role not in (Qt.DisplayRole, Qt.EditRole):
+            return None
+        return self.COLUMNS[index.column()][1](self.workers[index.row()])
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if role != Qt.DisplayRole:
+            return None
+        if orientation == Qt.Horizontal:
+            return self.COLUMNS[section][0]
+        return str(section + 1)
+
+    def flags(self, index):
+        return super().flags(index) | Qt.ItemIsEditable
+
+    def setData(self, index, value, role=Qt.EditRole):
+        if not index.isValid() or role != Qt.EditRole:
+            return False
+        worker = self.workers[index.row()]
+        column = index.column()
+        text = str(value).strip()
+        if column == 0:
+            worker.identification = text
+        elif column == 1:
+            worker.work_dates = parse_work_periods(split_list(text))
+        elif column == 2:
+            try:
+                worker.percentage_shifts = float(text) if text else 100.0
+            except ValueError:
+                return False
+        elif column == 3:
+            worker.group = text or '1'
+        elif column == 4:
+            worker.incompatible_job = split_list(text)
+        elif column == 5:
+            worker.group_incompatibility = split_list(text)
+        elif column == 6:
+            worker.obligatory_coverage = split_list(text)
+        else:
+            worker.unavailable_dates = split_list(text)
+        self.dataChanged.emit(index, index, [Qt.DisplayRole, Qt.EditRole])
+        return True
+
+    def set_workers(self, workers):
+        """Replace the whole roster in one reset instead of row by row."""
+        self.beginResetModel()
+        self.workers = list(workers)
+        self.endResetModel()
+
+    def resize(self, num_workers):
+        current = len(self.workers)
+        if num_workers > current:
+            self.beginInsertRows(QModelIndex(), current, num_workers - 1)
+            self.workers.extend(Worker(f"{row + 1}") for row in range(current, num_workers))
+            self.endInsertRows()
+        elif num_workers < current:
+            self.beginRemoveRows(QModelIndex(), num_workers, current - 1)
+            del self.workers[num_workers:]
+            self.endRemoveRows()
+
+    def scheduling_workers(self):
+        # schedule_shifts mutates its workers (quotas, default work periods), so it gets copies
+        return copy.deepcopy(self.workers)
+
 class MainWindow(QMainWindow):
     def __init__(self):
         super().__init__()
@@ -53,8 +181,12 @@ class MainWindow(QMainWindow):
         self.min_distance_input = QLineEdit()
         self.max_shifts_per_week_input = QLineEdit()
         self.previous_shifts_input = QLineEdit()
-        self.worker_inputs = []
+        self.worker_model = WorkerTableModel()
+        self.schedule_task = None
         self.schedule_button = QPushButton("Poner Guardias")
+        self.cancel_button = QPushButton("Cancelar")
+        self.cancel_button.setEnabled(False)
+        self.progress_bar = QProgressBar()
         self.export_ical_button = QPushButton("Exportar a iCalendar")
         self.export_pdf_button = QPushButton("Exportar a PDF")
         self.export_csv_button = QPushButton("Exportar a CSV")
@@ -63,6 +195,7 @@ class MainWindow(QMainWindow):
 
         # Connect buttons to functions
         self.schedule_button.clicked.connect(self.schedule_shifts)
+        self.cancel_button.clicked.connect(self.cancel_scheduling)
         self.export_ical_button.clicked.connect(self.export_to_ical)
         self.export_pdf_button.clicked.connect(self.export_to_pdf)
         self.export_csv_button.clicked.connect(self.export_to_csv)
@@ -86,21 +219,16 @@ class MainWindow(QMainWindow):
         layout.addWidget(self.breakdown_button)
         layout.addWidget(self.import_csv_button)  # Add the CSV import button to the layout
 
-        # Worker inputs layout
-        self.worker_layout = QGridLayout()
-
-        # Scroll area for worker inputs
-        self.scroll_area = QScrollArea()
-        self.scroll_area.setWidgetResizable(True)
-        self.scroll_area_widget = QWidget()
-        self.scroll_area_widget.setLayout(self.worker_layout)
-        self.scroll_area.setWidget(self.scroll_area_widget)
-
-        layout.addWidget(self.scroll_area)
+        # Worker table, only the visible rows are rendered
+        self.worker_table = QTableView()
+        self.worker_table.setModel(self.worker_model)
+        layout.addWidget(self.worker_table)
 
         self.num_workers_input.textChanged.connect(self.update_worker_inputs)
 
         layout.addWidget(self.schedule_button)
+        layout.addWidget(self.cancel_button)
+        layout.addWidget(self.progress_bar)
         layout.addWidget(self.export_ical_button)
         layout.addWidget(self.export_pdf_button)
         layout.addWidget(self.export_csv_button)
@@ -110,103 +238,64 @@ class MainWindow(QMainWindow):
 
     def update_worker_inputs(self):
         num_workers = int(self.num_workers_input.text()) if self.num_workers_input.text().isdigit() else 0
-        for i in reversed(range(self.worker_layout.count())):
-            self.worker_layout.itemAt(i).widget().setParent(None)
-        self.worker_inputs = []
-        for i in range(num_workers):
-            identification_input = QLineEdit()
-            identification_input.setFixedWidth(50)
-            working_dates_input = QLineEdit()
-            working_dates_input.setFixedWidth(100)
-            percentage_shifts_input = QLineEdit()
-            percentage_shifts_input.setFixedWidth(30)
-            group_input = QLineEdit()
-            group_input.setFixedWidth(20)
-            position_incompatibility_input = QLineEdit()
-            position_incompatibility_input.setFixedWidth(20)
-            group_incompatibility_input = QLineEdit()
-            group_incompatibility_input.setFixedWidth(20)
-            obligatory_coverage_input = QLineEdit()
-            obligatory_coverage_input.setFixedWidth(100)
-            unavailable_dates_input = QLineEdit()
-            unavailable_dates_input.setFixedWidth(100)
-
-            self.worker_layout.addWidget(QLabel(f"Identificación {i+1}:"), i, 0)
-            self.worker_layout.addWidget(identification_input, i, 1)
-            self.worker_layout.addWidget(QLabel("Cuando trabaja (separado por comas):"), i, 2)
-            self.worker_layout.addWidget(working_dates_input, i, 3)
-            self.worker_layout.addWidget(QLabel("Porcentaje de jornada:"), i, 4)
-            self.worker_layout.addWidget(percentage_shifts_input, i, 5)
-            self.worker_layout.addWidget(QLabel("Grupo:"), i, 6)
-            self.worker_layout.addWidget(group_input, i, 7)
-            self.worker_layout.addWidget(QLabel("No trabaja Rosell:"), i, 8)
-            self.worker_layout.addWidget(position_incompatibility_input, i, 9)
-            self.worker_layout.addWidget(QLabel("Incompatibilidad con grupo:"), i, 10)
-            self.worker_layout.addWidget(group_incompatibility_input, i, 11)
-            self.worker_layout.addWidget(QLabel("Guardias obligatorias (separadas por comas):"), i, 12)
-            self.worker_layout.addWidget(obligatory_coverage_input, i, 13)
-            self.worker_layout.addWidget(QLabel("Guardias No disponible (separado por comas):"), i, 14)
-            self.worker_layout.addWidget(unavailable_dates_input, i, 15)
-
-            self.worker_inputs.append({
-                'identification': identification_input,
-                'working_dates': working_dates_input,
-                'percentage_shifts': percentage_shifts_input,
-                'group': group_input,
-                'position_incompatibility': position_incompatibility_input,
-                'group_incompatibility': group_incompatibility_input,
-                'obligatory_coverage': obligatory_coverage_input,
-                'unavailable_dates': unavailable_dates_input
-            })
+        self.worker_model.resize(num_workers)
 
     def schedule_shifts(self):
-    # Get inputs
-    work_periods = self.work_periods_input.text().split(',')
-    holidays = self.holidays_input.text().split(',')
-    jobs = self.jobs_input.text().split(',')
-    num_workers = int(self.num_workers_input.text())
-    min_distance = int(self.min_distance_input.text())
-    max_shifts_per_week = int(self.max_shifts_per_week_input.text())
-    # Create workers list from user input
-    workers = [
-        Worker(
-            input['identification'].text(),
-            [period.strip() for period in input['working_dates'].text().split(',')] if input['working_dates'].text() else [],
-            float(input['percentage_shifts'].text() or 100),  # Default to 100 if blank
-            input['group'].text() or '1',
-            input['position_incompatibility'].text().split(',') if input['position_incompatibility'].text() else [],
-            input['group_incompatibility'].text().split(',') if input['group_incompatibility'].text() else [],
-            [date.strip() for date in input['obligatory_coverage'].text().split(',')] if input['obligatory_coverage'].text() else [],
-            [date.strip() for date in input['unavailable_dates'].text().split(',')] if input['unavailable_dates'].text() else [],
-            previously_assigned_shifts=[]  # Initialize with an empty list or load from CSV if available
-        )
-        for input in self.worker_inputs
-    ]
-    # Schedule shifts
-    schedule = schedule_shifts(work_periods, holidays, jobs, workers, min_distance, max_shifts_per_week)
-    self.schedule = schedule  # Save the schedule for exporting
+        # Get inputs
+        work_periods = self.work_periods_input.text().split(',')
+        holidays = self.holidays_input.text().split(',')
+        jobs = self.jobs_input.text().split(',')
+        min_distance = int(self.min_distance_input.text())
+        max_shifts_per_week = int(self.max_shifts_per_week_input.text())
+        workers = self.worker_model.scheduling_workers()
+        # Schedule shifts on a pool thread so the window stays responsive
+        self.schedule_task = ScheduleTask(work_periods, holidays, jobs, workers, min_distance, max_shifts_per_week)
+        self.schedule_task.signals.progress.connect(self.update_progress)
+        self.schedule_task.signals.finished.connect(self.show_schedule)
+        self.schedule_task.signals.failed.connect(self.scheduling_failed)
+        self.schedule_task.signals.cancelled.connect(self.scheduling_cancelled)
+        self.progress_bar.setValue(0)
+        self.schedule_button.setEnabled(False)
+        self.cancel_button.setEnabled(True)
+        QThreadPool.globalInstance().start(self.schedule_task)
+
+    def update_progress(self, days_done, total_days):
+        self.progress_bar.setMaximum(total_days)
+        self.progress_bar.setValue(days_done)
+
+    def show_schedule(self, schedule):
+        self.scheduling_done()
+        self.schedule = schedule  # Save the schedule for exporting
+        self.schedule_window = ScheduleOutputWindow(schedule)
+        self.schedule_window.show()
+
+    def scheduling_failed(self, message):
+        self.scheduling_done()
+        QMessageBox.critical(self, "Error", message)
+
+    def scheduling_cancelled(self):
+        self.scheduling_done()
+        self.progress_bar.setValue(0)
+
+    def scheduling_done(self):
+        self.schedule_task = None
+        self.schedule_button.setEnabled(True)
+        self.cancel_button.setEnabled(False)
+
+    def cancel_scheduling(self):
+        if self.schedule_task is not None:
+            self.schedule_task.cancel()
+
+    def closeEvent(self, event):
+        self.cancel_scheduling()
+        super().closeEvent(event)
 
-    self.schedule_window = ScheduleOutputWindow(schedule)
-    self.schedule_window.show()
-                        
     def import_from_csv(self):
-    options = QFileDialog.Options()
-    filePath, _ = QFileDialog.getOpenFileName(self, "Import Workers from CSV", "", "CSV Files (*.csv);;All Files (*)", options=options)
-    if filePath:
-        workers = import_workers_from_csv(filePath)
-        for worker in workers:
-            # Update UI with imported worker data
-            self.num_workers_input.setText(str(len(workers)))
-            self.update_worker_inputs()
-            for i, worker in enumerate(workers):
-                self.worker_inputs[i]['identification'].setText(worker.identification)
-                self.worker_inputs[i]['working_dates'].setText(','.join([f"{start.strftime('%d/%m/%Y')}-{end.strftime('%d/%m/%Y')}" for start, end in worker.work_dates]))
-                self.worker_inputs[i]['percentage_shifts'].setText(str(worker.percentage_shifts))
-                self.worker_inputs[i]['group'].setText(worker.group)
-                self.worker_inputs[i]['position_incompatibility'].setText(','.join(worker.incompatible_job))
-                self.worker_inputs[i]['group_incompatibility'].setText(','.join(worker.group_incompatibility))
-                self.worker_inputs[i]['obligatory_coverage'].setText(','.join([date.strftime('%d/%m/%Y') for date in worker.obligatory_coverage]))
-                self.worker_inputs[i]['unavailable_dates'].setText(','.join([date.strftime('%d/%m/%Y') for date in worker.unavailable_dates]))
+        options = QFileDialog.Options()
+        filePath, _ = QFileDialog.getOpenFileName(self, "Import Workers from CSV", "", "CSV Files (*.csv);;All Files (*)", options=options)
+        if filePath:
+            self.worker_model.set_workers(import_workers_from_csv(filePath))
+            self.num_workers_input.setText(str(self.worker_model.rowCount()))
 
     def export_to_ical(self):
         options = QFileDialog.Options()
@@ -221,30 +310,22 @@ class MainWindow(QMainWindow):
             export_schedule_to_pdf(self.schedule, filePath)
 
     def export_icalendar(self, filePath):
-        cal = Calendar()
-        for job, shifts in self.schedule.items():
-            for date_str, worker_id in shifts.items():
-                date = datetime.strptime(date_str, "%d/%m/%Y")
-                event = Event()
-                event.add('summary', f'Shift for Job {job}')
-                event.add('dtstart', date)
-                event.add('dtend', date)
-                event.add('description', f'Worker: {worker_id}')
-                cal.add_component(event)
-        with open(filePath, 'wb') as f:
-            f.write(cal.to_ical())
-            
+        export_schedule_to_ics(self.schedule, filePath)
+
     def display_breakdown(self):
+        # One row of fairness figures per worker, computed for the whole roster at once, followed by their shifts
+        stats = schedule_statistics(self.schedule)
         breakdown = prepare_breakdown(self.schedule)
+        headers = stats.headers() + ["Shifts Assigned"]
         table = QTableWidget()
-        table.setColumnCount(2)
-        table.setHorizontalHeaderLabels(["Worker", "Shifts Assigned"])
-        table.setRowCount(len(breakdown))
-        for row, (worker_id, shifts) in enumerate(breakdown.items()):
-            worker_item = QTableWidgetItem(worker_id)
-            shifts_item = QTableWidgetItem(", ".join([f"{date}: {job}" for date, job in shifts]))
-            table.setItem(row, 0, worker_item)
-            table.setItem(row, 1, shifts_item)
+        table.setColumnCount(len(headers))
+        table.setHorizontalHeaderLabels(headers)
+        table.setRowCount(len(stats))
+        for row, (worker_id, values) in enumerate(zip(stats.worker_ids, stats.rows())):
+            for column, value in enumerate(values):
+                table.setItem(row, column, QTableWidgetItem('' if value is None else str(value)))
+            shifts_item = QTableWidgetItem(", ".join([f"{date}: {job}" for date, job in breakdown.get(worker_id, [])]))
+            table.setItem(row, len(values), shifts_item)
         layout = self.centralWidget().layout()
         layout.addWidget(table)
 
@@ -255,7 +336,8 @@ class MainWindow(QMainWindow):
         if filePath:
             export_schedule_to_csv(self.schedule, filePath)
              
-app = QApplication(sys.argv)
-window = MainWindow()
-window.show()
-sys.exit(app.exec())
+if __name__ == "__main__":
+    app = QApplication(sys.argv)
+    window = MainWindow()
+    window.show()
+    sys.exit(app.exec())
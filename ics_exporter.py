@@ -0,0 +1,101 @@
+import hashlib
+import os
+import re
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta, timezone
+
+from instrumentation import instrumentation
+from shift_scheduler import iter_shift_rows, parse_date
+
+PRODID = '-//Shift Scheduler//EN'
+
+def _escape(text):
+    return str(text).replace('\\', '\\\\').replace(';', '\\;').replace(',', '\\,').replace('\n', '\\n')
+
+def _fold(line):
+    # Content lines are limited to 75 octets; continuations start with a space
+    data = line.encode('utf-8')
+    if len(data) <= 75:
+        return line + '\r\n'
+    parts = []
+    while data:
+        size = 75 if not parts else 74
+        while size < len(data) and (data[size] & 0xC0) == 0x80:
+            size -= 1  # Never split a UTF-8 sequence
+        parts.append(data[:size].decode('utf-8'))
+        data = data[size:]
+    return '\r\n '.join(parts) + '\r\n'
+
+def event_uid(date_str, job):
+    """UID of the event for a job on a date, stable across exports and reassignments."""
+    return hashlib.sha1(f"{date_str}|{job}".encode('utf-8')).hexdigest() + '@shift-scheduler'
+
+def _event(date_str, job, worker_id, dtstamp):
+    date = parse_date(date_str)
+    return ''.join(_fold(line) for line in (
+        'BEGIN:VEVENT',
+        f'UID:{event_uid(date_str, job)}',
+        f'DTSTAMP:{dtstamp}',
+        f'DTSTART;VALUE=DATE:{date:%Y%m%d}',
+        f'DTEND;VALUE=DATE:{date + timedelta(days=1):%Y%m%d}',
+        f'SUMMARY:{_escape(f"Shift for Job {job}")}',
+        f'DESCRIPTION:{_escape(f"Worker: {worker_id}")}',
+        'END:VEVENT'
+    ))
+
+def write_ics(filename, shifts, calendar_name='Shift Schedule', dtstamp=None):
+    """Stream (date_str, job, worker_id) shifts to an .ics file, one event per shift."""
+    dtstamp = dtstamp or datetime.now(timezone.utc).strftime('%Y%m%dT%H%M%SZ')
+    with open(filename, 'w', encoding='utf-8', newline='') as file:
+        file.write(''.join(_fold(line) for line in (
+            'BEGIN:VCALENDAR',
+            'VERSION:2.0',
+            f'PRODID:{PRODID}',
+            'CALSCALE:GREGORIAN',
+            f'X-WR-CALNAME:{_escape(calendar_name)}'
+        )))
+        for date_str, job, worker_id in shifts:
+            file.write(_event(date_str, job, worker_id, dtstamp))
+        file.write('END:VCALENDAR\r\n')
+
+@instrumentation.timed('export_ics')
+def export_schedule_to_ics(schedule, filename='shift_schedule.ics'):
+    """Write the whole schedule as one combined feed."""
+    write_ics(filename, ((date_str, job, worker_id) for date_str, job, worker_id, _, _ in iter_shift_rows(schedule)))
+
+def worker_feed_filename(directory, worker_id):
+    return os.path.join(directory, re.sub(r'[^\w.-]', '_', str(worker_id)) + '.ics')
+
+def _write_worker_feeds(feeds, directory, dtstamp):
+    paths = {}
+    for worker_id, shifts in feeds:
+        paths[worker_id] = worker_feed_filename(directory, worker_id)
+        write_ics(paths[worker_id], shifts, f'Shifts for {worker_id}', dtstamp)
+    return paths
+
+@instrumentation.timed('export_ics_feeds')
+def export_worker_feeds(schedule, directory, processes=None):
+    """Write one feed per worker into directory and return {worker_id: path}.
+
+    Shifts are grouped by worker in one pass over the schedule, then the
+    feeds are written by a process pool in contiguous batches of workers.
+    Events keep the UIDs of the combined feed.
+    """
+    os.makedirs(directory, exist_ok=True)
+    shifts_by_worker = defaultdict(list)
+    for date_str, job, worker_id, _, _ in iter_shift_rows(schedule):
+        shifts_by_worker[worker_id].append((date_str, job, worker_id))
+    feeds = list(shifts_by_worker.items())
+    dtstamp = datetime.now(timezone.utc).strftime('%Y%m%dT%H%M%SZ')
+
+    processes = min(processes or os.cpu_count() or 1, len(feeds))
+    if processes <= 1:
+        return _write_worker_feeds(feeds, directory, dtstamp)
+    size = -(-len(feeds) // processes)
+    batches = [feeds[i:i + size] for i in range(0, len(feeds), size)]
+    paths = {}
+    with ProcessPoolExecutor(max_workers=processes) as executor:
+        for batch_paths in executor.map(_write_worker_feeds, batches, [directory] * len(batches), [dtstamp] * len(batches)):
+            paths.update(batch_paths)
+    return paths
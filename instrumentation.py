@@ -0,0 +1,190 @@
+import cProfile
+import functools
+import json
+import logging
+import os
+import time
+import tracemalloc
+from collections import Counter, defaultdict
+from contextlib import contextmanager
+
+logger = logging.getLogger("shift_scheduler")
+
+class Instrumentation:
+    """Opt-in counters and traces for the scheduling hot path.
+
+    Everything is off by default. Call sites check ``enabled`` (or
+    ``tracing``) before doing any work, so a disabled run pays one attribute
+    lookup per check and never builds a log message.
+
+    With profile on, every phase also records the memory it allocated
+    (net and peak, through tracemalloc) and, with cprofile, runs under a
+    cProfile profiler of its own; a phase nested in a profiled one is
+    counted in the outer phase's profile. See profiling().
+    """
+    def __init__(self):
+        self.enabled = False
+        self.tracing = False
+        self.profile = False
+        self.cprofile = False
+        self._started_tracemalloc = False
+        self.reset()
+
+    def enable(self, tracing=False, profile=False, cprofile=False):
+        self.enabled = True
+        self.tracing = tracing
+        self.profile = profile
+        self.cprofile = profile and cprofile
+        if profile and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._started_tracemalloc = True
+
+    def disable(self):
+        self.enabled = False
+        self.tracing = False
+        self.profile = False
+        self.cprofile = False
+        if self._started_tracemalloc:
+            tracemalloc.stop()
+            self._started_tracemalloc = False
+
+    def reset(self):
+        self.rejections = Counter()
+        self.phase_events = defaultdict(Counter)
+        self.phase_calls = Counter()
+        self.phase_seconds = defaultdict(float)
+        self.phase_allocated = defaultdict(int)
+        self.phase_peak = defaultdict(int)
+        self.profilers = {}
+        # [start bytes, peak bytes] of the phases being measured, outermost first
+        self._memory_frames = []
+        self._active_profiler = None
+
+    def reject(self, reason, count=1):
+        self.rejections[reason] += count
+
+    def count(self, phase, event, count=1):
+        self.phase_events[phase][event] += count
+
+    def trace(self, message, *args):
+        # Arguments are only formatted if the logger actually emits the record
+        if self.tracing:
+            logger.debug(message, *args)
+
+    @contextmanager
+    def phase(self, name):
+        if not self.enabled:
+            yield
+            return
+        if self.profile:
+            with self._profiled_phase(name):
+                yield
+            return
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phase_calls[name] += 1
+            self.phase_seconds[name] += time.perf_counter() - start
+
+    def timed(self, name):
+        """Decorator that runs each call of a function as phase name."""
+        def decorate(function):
+            @functools.wraps(function)
+            def wrapper(*args, **kwargs):
+                with self.phase(name):
+                    return function(*args, **kwargs)
+            return wrapper
+        return decorate
+
+    def _note_peak(self, peak):
+        for frame in self._memory_frames:
+            frame[1] = max(frame[1], peak)
+
+    @contextmanager
+    def _profiled_phase(self, name):
+        # tracemalloc has a single peak, so enclosing phases keep theirs before it is reset
+        current, peak = tracemalloc.get_traced_memory()
+        self._note_peak(peak)
+        tracemalloc.reset_peak()
+        frame = [current, current]
+        self._memory_frames.append(frame)
+        profiler = None
+        if self.cprofile and self._active_profiler is None:
+            profiler = self._active_profiler = self.profilers.setdefault(name, cProfile.Profile())
+            profiler.enable()
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            seconds = time.perf_counter() - start
+            if profiler is not None:
+                profiler.disable()
+                self._active_profiler = None
+            current, peak = tracemalloc.get_traced_memory()
+            self._note_peak(peak)
+            self._memory_frames.pop()
+            self.phase_calls[name] += 1
+            self.phase_seconds[name] += seconds
+            self.phase_allocated[name] += current - frame[0]
+            self.phase_peak[name] = max(self.phase_peak[name], frame[1] - frame[0])
+
+    def totals(self):
+        phases = {}
+        for name in sorted(set(self.phase_calls) | set(self.phase_events)):
+            phases[name] = {
+                'calls': self.phase_calls[name],
+                'seconds': self.phase_seconds[name],
+                'events': dict(self.phase_events[name])
+            }
+            if name in self.phase_peak:
+                # Net bytes still allocated when the phase ended, and the most it had allocated at once
+                phases[name]['allocated_bytes'] = self.phase_allocated[name]
+                phases[name]['peak_bytes'] = self.phase_peak[name]
+        return {'rejections': dict(self.rejections), 'phases': phases}
+
+    def dump(self, file=None):
+        """Write the totals as JSON to a file object, or return them as a JSON string."""
+        text = json.dumps(self.totals(), indent=2, sort_keys=True)
+        if file is None:
+            return text
+        file.write(text)
+
+    def save(self, directory, prefix='profile'):
+        """Write the totals to <prefix>.json and each phase's cProfile stats to <prefix>-<phase>.pstats in directory.
+
+        Returns the paths written; the .pstats files load with pstats.Stats.
+        """
+        os.makedirs(directory, exist_ok=True)
+        paths = [os.path.join(directory, f"{prefix}.json")]
+        with open(paths[0], 'w') as file:
+            self.dump(file)
+        for name, profiler in sorted(self.profilers.items()):
+            path = os.path.join(directory, f"{prefix}-{name}.pstats")
+            profiler.dump_stats(path)
+            paths.append(path)
+        return paths
+
+instrumentation = Instrumentation()
+
+@contextmanager
+def profiling(directory=None, prefix='profile', cprofile=True):
+    """Profile every instrumented phase run inside the block.
+
+    Counters start from zero; per phase the wall time, calls, allocated
+    and peak bytes and, with cprofile, the cProfile stats are recorded.
+    With a directory they are saved there on exit (see
+    Instrumentation.save); the instrumentation object is yielded either
+    way, and the previous settings come back afterwards.
+    """
+    previous = (instrumentation.enabled, instrumentation.tracing)
+    instrumentation.reset()
+    instrumentation.enable(tracing=previous[1], profile=True, cprofile=cprofile)
+    try:
+        yield instrumentation
+    finally:
+        instrumentation.disable()
+        if previous[0]:
+            instrumentation.enable(tracing=previous[1])
+        if directory is not None:
+            instrumentation.save(directory, prefix)
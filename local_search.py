@@ -0,0 +1,228 @@
+import random
+import time
+
+import numpy as np
+
+from instrumentation import instrumentation
+from constraints import CYCLE_DAYS
+from shift_scheduler import ScheduleGrid
+
+# Lower is better; the same scale as multistart.DEFAULT_WEIGHTS
+DEFAULT_WEIGHTS = {
+    'unfilled_slots': 1000.0,
+    'violations': 10.0,
+    'quota_deviation': 1.0
+}
+
+class LocalSearch:
+    """Move and swap shifts of a schedule_shifts result to lower its cost.
+
+    The cost of a worker is their broken rules (shift pairs too close, on
+    the same weekday within four weeks or the same job on consecutive days,
+    two shifts on one day, shifts outside their work dates or on unavailable
+    days, weeks over max_shifts_per_week, weekend shifts over the cap) plus
+    how far they are from their quota. A move only changes two workers and at most two days,
+    so it is evaluated by re-costing just those. Who may take a shift is
+    decided by the run's constraint engine, custom rules included: a worker
+    must pass the hard rules, and those passing the others too are tried
+    first.
+    """
+    def __init__(self, schedule, weights=None, candidates=8, seed=0):
+        self.state = schedule.state
+        self.weights = dict(DEFAULT_WEIGHTS, **(weights or {}))
+        self.candidates = candidates
+        self.random = random.Random(seed)
+        state = self.state
+        horizon = state.horizon
+        self.grid = state.grid
+        self.occupied = state.occupancy()
+        self.in_periods = state.period_mask()
+        self.week_indices = np.asarray(horizon.week_indices)
+        self.weekend_or_holiday = np.asarray(horizon.weekend_or_holiday, dtype=bool)
+        self.adjusted_min_distance = state.min_distance * 100 / state.roster_arrays.percentage_shifts
+        self.active = np.array([worker.identification not in state.removed for worker in state.workers], dtype=bool)
+        # A job row each worker works on each day, EMPTY when off; roster_arrays.shift_days counts double bookings
+        self.job_of = np.full(self.occupied.shape, ScheduleGrid.EMPTY, dtype=np.int32)
+        job_rows, offsets = np.nonzero(self.grid.assignments != ScheduleGrid.EMPTY)
+        self.job_of[self.grid.assignments[job_rows, offsets], offsets] = job_rows
+        self.stats = {'fills': 0, 'moves': 0, 'swaps': 0, 'evaluations': 0}
+
+    def violations(self, row):
+        """Broken rules in one worker's shifts; also returns the offsets involved."""
+        state = self.state
+        availability = state.availability
+        offsets = np.flatnonzero(self.occupied[row])
+        if not offsets.size:
+            return 0, offsets
+        jobs = self.job_of[row, offsets]
+        gaps = np.diff(offsets)
+        pair = (gaps < self.adjusted_min_distance[row]) | ((gaps % 7 == 0) & (gaps <= CYCLE_DAYS)) | ((gaps == 1) & (jobs[1:] == jobs[:-1]))
+        # Shifts beyond the first on a day the override fallback double-booked
+        extra = state.roster_arrays.shift_days[row, offsets] - 1
+        obligatory = availability.obligatory[row, offsets]
+        misplaced = availability.unavailable[row, offsets] | (~availability.in_work_period[row, offsets] & ~obligatory)
+        weeks = self.week_indices[offsets]
+        weekly = np.bincount(weeks, minlength=state.horizon.num_weeks) - state.max_shifts_per_week
+        weekend = self.weekend_or_holiday[offsets]
+        weekend_excess = max(int(weekend.sum()) - 4, 0)
+        count = int(pair.sum() + extra.sum() + misplaced.sum() + np.clip(weekly, 0, None).sum()) + weekend_excess
+
+        involved = (extra > 0) | misplaced | (weekly[weeks] > 0) | (weekend if weekend_excess else False)
+        involved[1:] |= pair
+        involved[:-1] |= pair
+        return count, offsets[involved & ~obligatory]
+
+    def group_conflicts(self, offset):
+        rows = self.grid.assignments[:, offset]
+        rows = rows[rows != ScheduleGrid.EMPTY]
+        occupancy = self.state.group_occupancy
+        return int((occupancy.incompatibility_matrix[rows] * occupancy.counts[offset]).sum())
+
+    def cost(self, rows, offsets):
+        self.stats['evaluations'] += 1
+        quota = self.state.roster_arrays.shift_quota
+        return (self.weights['violations'] * (sum(self.violations(row)[0] for row in rows) + sum(self.group_conflicts(offset) for offset in offsets))
+                + self.weights['quota_deviation'] * float(np.abs(quota[list(rows)]).sum()))
+
+    def total(self):
+        empty = self.grid.assignments == ScheduleGrid.EMPTY
+        unfilled = int(np.count_nonzero(empty[:, self.in_periods]))
+        active = np.flatnonzero(self.active)
+        violations = sum(self.violations(row)[0] for row in active) + sum(self.group_conflicts(offset) for offset in range(self.state.horizon.num_days))
+        quota_deviation = float(np.abs(self.state.roster_arrays.shift_quota[active]).sum())
+        return {
+            'unfilled_slots': unfilled,
+            'violations': violations,
+            'quota_deviation': quota_deviation,
+            'total': self.weights['unfilled_slots'] * unfilled + self.weights['violations'] * violations + self.weights['quota_deviation'] * quota_deviation
+        }
+
+    def _movable(self, row, offset):
+        worker = self.state.workers[row]
+        job = self.state.jobs[self.job_of[row, offset]]
+        return self.in_periods[offset] and worker.obligatory_coverage_shifts.get(self.state.horizon.dates[offset]) != job
+
+    def _free_rows(self, offset, job_row):
+        """Workers who could take a job_row shift on offset, at most self.candidates of them.
+
+        Those the soft rules allow come first, then those only the hard rules
+        allow; most quota left first within each.
+        """
+        strict, override = self.state.constraints.placement_masks(self.state, offset, job_row)
+        free = self.active & ~self.occupied[:, offset]
+        quota = self.state.roster_arrays.shift_quota
+        rows = []
+        for mask in (strict & free, override & free & ~strict):
+            candidates = np.flatnonzero(mask)
+            rows.extend(candidates[np.argsort(-quota[candidates], kind='stable')].tolist())
+        return rows[:self.candidates]
+
+    def _put(self, row, offset, job_row):
+        self.state.place(self.occupied, row, offset, job_row)
+        self.job_of[row, offset] = job_row
+
+    def _take(self, row, offset):
+        job_row = int(self.job_of[row, offset])
+        self.state.release(self.occupied, row, offset, job_row)
+        # Falls back to the other shift of a double-booked day
+        job_rows = np.flatnonzero(self.grid.assignments[:, offset] == row)
+        self.job_of[row, offset] = job_rows[0] if job_rows.size else ScheduleGrid.EMPTY
+        return job_row
+
+    def try_fill(self, offset, job_row):
+        best = None
+        for row in self._free_rows(offset, job_row):
+            before = self.cost((row,), (offset,))
+            self._put(row, offset, job_row)
+            delta = self.cost((row,), (offset,)) - before
+            self._take(row, offset)
+            if best is None or delta < best[0]:
+                best = (delta, row)
+        if best is None:
+            return False
+        self._put(best[1], offset, job_row)
+        self.stats['fills'] += 1
+        return True
+
+    def try_move(self, row, offset):
+        """Give the shift to another worker who is free that day; keeps the first change that lowers the cost."""
+        for other in self._free_rows(offset, self.job_of[row, offset]):
+            before = self.cost((row, other), (offset,))
+            job_row = self._take(row, offset)
+            self._put(other, offset, job_row)
+            if self.cost((row, other), (offset,)) < before:
+                self.stats['moves'] += 1
+                return True
+            self._take(other, offset)
+            self._put(row, offset, job_row)
+        return False
+
+    def try_swap(self, row, offset, window=14):
+        """Trade the shift for one of another worker's shifts within window days."""
+        for other in self._free_rows(offset, self.job_of[row, offset]):
+            lo, hi = max(offset - window, 0), min(offset + window + 1, self.occupied.shape[1])
+            for other_offset in (lo + np.flatnonzero(self.occupied[other, lo:hi])).tolist():
+                if self.occupied[row, other_offset] or not self._movable(other, other_offset):
+                    continue
+                before = self.cost((row, other), (offset, other_offset))
+                job_row = self._take(row, offset)
+                other_job_row = self._take(other, other_offset)
+                # Checked with both shifts given up, so the quota and weekly counts already reflect the trade
+                if self.state.constraints.placement_masks(self.state, other_offset, other_job_row)[1][row]:
+                    self._put(other, offset, job_row)
+                    self._put(row, other_offset, other_job_row)
+                    if self.cost((row, other), (offset, other_offset)) < before:
+                        self.stats['swaps'] += 1
+                        return True
+                    self._take(other, offset)
+                    self._take(row, other_offset)
+                self._put(row, offset, job_row)
+                self._put(other, other_offset, other_job_row)
+        return False
+
+    def run(self, time_budget):
+        deadline = time.perf_counter() + time_budget
+        improved = True
+        while improved and time.perf_counter() < deadline:
+            improved = False
+            empty = (self.grid.assignments == ScheduleGrid.EMPTY) & self.in_periods
+            for job_row, offset in zip(*np.nonzero(empty)):
+                if time.perf_counter() >= deadline:
+                    return
+                improved |= self.try_fill(int(offset), int(job_row))
+
+            quota = self.state.roster_arrays.shift_quota
+            rows = np.flatnonzero(self.active).tolist()
+            self.random.shuffle(rows)
+            for row in rows:
+                count, offsets = self.violations(row)
+                if not count and quota[row] > -0.5:
+                    continue
+                # Shifts that break a rule first; an over-quota worker can give away any shift
+                targets = offsets.tolist() if count else np.flatnonzero(self.occupied[row]).tolist()
+                for offset in targets:
+                    if time.perf_counter() >= deadline:
+                        return
+                    if self.occupied[row, offset] and self._movable(row, offset) and (self.try_move(row, offset) or self.try_swap(row, offset)):
+                        improved = True
+                        break
+
+@instrumentation.timed('local_search')
+def improve_schedule(schedule, time_budget=1.0, weights=None, candidates=8, seed=0):
+    """Improve a schedule returned by schedule_shifts in place with moves and swaps.
+
+    Runs hill climbing until no move helps or time_budget seconds have
+    passed. Obligatory shifts and shifts outside the work periods are never
+    moved; every tracker in schedule.state stays consistent, so the result
+    can still be repaired or exported. Returns a dict with the cost
+    'before' and 'after', the number of fills, moves and swaps made, and
+    the slot 'changes' as (job, date_str, previous worker id, new worker id).
+    """
+    search = LocalSearch(schedule, weights, candidates, seed)
+    before_assignments = search.grid.assignments.copy()
+    start = time.perf_counter()
+    before = search.total()
+    search.run(time_budget)
+    result = dict(search.stats, before=before, after=search.total(), seconds=time.perf_counter() - start)
+    result['changes'] = search.state.changes(before_assignments)
+    return result
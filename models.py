@@ -1,14 +1,4 @@
-class Worker:
-    def __init__(self, id, work_dates, percentage, group, incompatible_job, group_incompatibility, obligatory_coverage, day_off):
-        self.id = id
-        self.work_dates = work_dates
-        self.percentage = percentage if percentage != "" else 100.0
-        self.group = group
-        self.incompatible_job = incompatible_job
-        self.group_incompatibility = group_incompatibility
-        self.obligatory_coverage = obligatory_coverage
-        self.unavailable_dates = unavailable_dates
-        self.has_exception = False  # Add this line to track exceptions
+from worker import Worker
 
 class Shift:
     def __init__(self, date, job, worker_id):
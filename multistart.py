@@ -0,0 +1,104 @@
+import copy
+import os
+import random
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from shift_scheduler import schedule_shifts, parse_work_periods, ScheduleGrid
+
+# Lower is better; an unfilled slot costs more than any amount of imbalance on a filled roster
+DEFAULT_WEIGHTS = {
+    'unfilled_slots': 1000.0,
+    'quota_deviation': 1.0,
+    'weekend_imbalance': 1.0,
+    'job_repetitions': 0.1
+}
+
+def score_schedule(schedule, workers, work_periods, weights=None):
+    """Score a schedule returned by schedule_shifts with the workers it was run on.
+
+    Returns a dict with each criterion and their weighted 'total':
+    unfilled_slots in the work periods, quota_deviation (sum of the quota
+    each worker is left over or under), weekend_imbalance (standard
+    deviation of weekend/holiday shifts per full-time equivalent) and
+    job_repetitions (consecutive shifts of a worker on the same job).
+    """
+    weights = dict(DEFAULT_WEIGHTS, **(weights or {}))
+    grid = schedule.grid
+    horizon = grid.horizon
+    filled = grid.assignments != ScheduleGrid.EMPTY
+
+    in_periods = np.zeros(horizon.num_days, dtype=bool)
+    for start_date, end_date in parse_work_periods(work_periods):
+        in_periods[max(horizon.offset(start_date), 0):horizon.offset(end_date) + 1] = True
+    unfilled_slots = int(np.count_nonzero(~filled[:, in_periods]))
+
+    quota_deviation = float(sum(abs(worker.shift_quota) for worker in workers))
+
+    job_rows, offsets = np.nonzero(filled)
+    worker_rows = grid.assignments[job_rows, offsets]
+    weekend_counts = np.bincount(worker_rows[np.asarray(horizon.weekend_or_holiday, dtype=bool)[offsets]], minlength=len(grid.worker_ids))
+    # Rows of the grid follow the order of the workers list schedule_shifts was given
+    full_time_equivalent = np.array([worker.percentage_shifts / 100 for worker in workers])
+    weekend_imbalance = float(np.std(weekend_counts / full_time_equivalent)) if len(workers) else 0.0
+
+    order = np.lexsort((offsets, worker_rows))
+    same_worker = worker_rows[order][1:] == worker_rows[order][:-1]
+    same_job = job_rows[order][1:] == job_rows[order][:-1]
+    job_repetitions = int(np.count_nonzero(same_worker & same_job))
+
+    score = {
+        'unfilled_slots': unfilled_slots,
+        'quota_deviation': quota_deviation,
+        'weekend_imbalance': weekend_imbalance,
+        'job_repetitions': job_repetitions
+    }
+    score['total'] = sum(weights[name] * value for name, value in score.items())
+    return score
+
+def _run_start(work_periods, holidays, jobs, workers, min_distance, max_shifts_per_week, seed, weights):
+    # schedule_shifts mutates its workers, so every start works on its own copies.
+    # Start 0 keeps the caller's worker order so the best-of result is never worse than a plain run
+    workers = copy.deepcopy(workers)
+    if seed:
+        random.Random(seed).shuffle(workers)
+    schedule = schedule_shifts(work_periods, holidays, jobs, workers, min_distance, max_shifts_per_week)
+    return score_schedule(schedule, workers, work_periods, weights), schedule, workers
+
+def best_of_schedules(work_periods, holidays, jobs, workers, min_distance, max_shifts_per_week, starts=None, processes=None, seed=0, weights=None):
+    """Run schedule_shifts from several worker orders in a process pool and keep the best.
+
+    The greedy pass breaks ties by roster order, so each start shuffles the
+    workers differently. Returns (schedule, score, scores) where scores
+    lists the score of every start in start order. The caller's workers
+    are updated with the state left by the winning run, as a plain
+    schedule_shifts call would, and the schedule's state is rebound to
+    them in the caller's order so schedule_repair edits reach them.
+    """
+    processes = processes or os.cpu_count() or 1
+    starts = starts or processes
+    seeds = [0] + [seed * starts + n for n in range(1, starts)]
+    args = [(work_periods, holidays, jobs, workers, min_distance, max_shifts_per_week, start_seed, weights) for start_seed in seeds]
+    if processes == 1 or starts == 1:
+        results = [_run_start(*start_args) for start_args in args]
+    else:
+        with ProcessPoolExecutor(max_workers=min(processes, starts)) as executor:
+            results = list(executor.map(_run_start, *zip(*args)))
+
+    best_score, best_schedule, best_workers = min(results, key=lambda result: result[0]['total'])
+    final_state = {worker.identification: worker for worker in best_workers}
+    for worker in workers:
+        winner = final_state.get(worker.identification)
+        if winner is not None:
+            worker.work_dates = winner.work_dates
+            worker.shift_quota = winner.shift_quota
+            worker.weekly_shift_quota = winner.weekly_shift_quota
+            worker.obligatory_coverage_shifts = winner.obligatory_coverage_shifts
+    best_schedule.state.rebind(workers)
+    return best_schedule, best_score, [score for score, _, _ in results]
+
+def schedule_shifts_multistart(work_periods, holidays, jobs, workers, min_distance, max_shifts_per_week, starts=None, processes=None, seed=0, weights=None):
+    """Drop-in replacement for schedule_shifts that returns the best of several randomized starts."""
+    schedule, _, _ = best_of_schedules(work_periods, holidays, jobs, workers, min_distance, max_shifts_per_week, starts, processes, seed, weights)
+    return schedule
@@ -1,13 +1,18 @@
 from fpdf import FPDF
-from datetime import datetime, timedelta
+from datetime import datetime
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
 import calendar
 
+from instrumentation import instrumentation
+from shift_scheduler import parse_date
+
 class PDFCalendar(FPDF):
     def header(self):
         self.set_font('Arial', 'B', 12)
         self.cell(0, 10, 'Shift Schedule Calendar', 0, 1, 'C')
 
-    def add_month(self, year, month, schedule):
+    def add_month(self, year, month, shifts_by_date):
         self.set_font('Arial', 'B', 12)
         self.cell(0, 10, f'{calendar.month_name[month]} {year}', 0, 1, 'C')
         self.ln(10)
@@ -29,8 +34,7 @@ class PDFCalendar(FPDF):
                     self.cell(25, 20, '', 1, 0, 'C')  # Adjusted height for content
                 else:
                     date_str = datetime(year, month, day).strftime("%d/%m/%Y")
-                    shifts = [worker for job, dates in schedule.items() for d, worker in dates.items() if d == date_str]
-                    cell_content = ", ".join(shifts)  # Insert commas between values
+                    cell_content = ", ".join(shifts_by_date.get(date_str, ()))  # Insert commas between values
                     self.cell(25, 20, cell_content, 1, 0, 'C')  # Adjusted height for content
 
             self.ln()
@@ -44,16 +48,75 @@ class PDFCalendar(FPDF):
                     self.cell(25, 10, day, 1, 0, 'C')
                 self.ln()
 
-def export_schedule_to_pdf(schedule, filename='shift_schedule.pdf'):
-    pdf = PDFCalendar()
-    start_date = min(datetime.strptime(date, "%d/%m/%Y") for job, dates in schedule.items() for date in dates.keys())
-    end_date = max(datetime.strptime(date, "%d/%m/%Y") for job, dates in schedule.items() for date in dates.keys())
+def group_shifts_by_date(schedule):
+    """Map each date string to the workers on shift that day, in job order."""
+    shifts_by_date = defaultdict(list)
+    for job, dates in schedule.items():
+        for date_str, worker in dates.items():
+            shifts_by_date[date_str].append(worker)
+    return shifts_by_date
+
+def schedule_months(shifts_by_date):
+    """List the (year, month) pairs from the first to the last scheduled date."""
+    if not shifts_by_date:
+        return []
+    # Only the distinct dates are parsed, once each
+    parsed = [parse_date(date_str) for date_str in shifts_by_date]
+    start_date, end_date = min(parsed), max(parsed)
+    return [
+        (year, month)
+        for year in range(start_date.year, end_date.year + 1)
+        for month in range(1, 13)
+        if (start_date.year, start_date.month) <= (year, month) <= (end_date.year, end_date.month)
+    ]
 
-    current_date = start_date
-    while current_date <= end_date:
+def _chunk_shifts(shifts_by_date, months):
+    suffixes = tuple(f"/{month:02d}/{year}" for year, month in months)
+    return {date_str: workers for date_str, workers in shifts_by_date.items() if date_str.endswith(suffixes)}
+
+def _render_months(months, shifts_by_date):
+    pdf = PDFCalendar()
+    for year, month in months:
         pdf.add_page()
-        pdf.add_month(current_date.year, current_date.month, schedule)
-        current_date += timedelta(days=32)
-        current_date = current_date.replace(day=1)
+        pdf.add_month(year, month, shifts_by_date)
+    return pdf
+
+def _render_chunk(months, shifts_by_date):
+    data = _render_months(months, shifts_by_date).output(dest='S')
+    # PyFPDF returns a latin-1 str, fpdf2 a bytearray
+    return data.encode('latin-1') if isinstance(data, str) else bytes(data)
+
+@instrumentation.timed('export_pdf')
+def export_schedule_to_pdf(schedule, filename='shift_schedule.pdf', processes=1):
+    """Write a month-per-page calendar of the schedule.
+
+    With processes > 1 the months are rendered as separate documents in a
+    process pool and merged in order, which needs pypdf; without it the
+    calendar is rendered in this process.
+    """
+    shifts_by_date = group_shifts_by_date(schedule)
+    months = schedule_months(shifts_by_date)
+
+    if processes > 1 and len(months) > 1:
+        try:
+            from pypdf import PdfWriter, PdfReader
+        except ImportError:
+            processes = 1
+    if processes <= 1 or len(months) <= 1:
+        _render_months(months, shifts_by_date).output(filename)
+        return
 
-    pdf.output(filename)
+    import io
+    # Contiguous runs of months, one per process; each only receives the shifts it draws
+    processes = min(processes, len(months))
+    size = -(-len(months) // processes)
+    chunks = [months[i:i + size] for i in range(0, len(months), size)]
+    chunk_shifts = [_chunk_shifts(shifts_by_date, chunk) for chunk in chunks]
+    with ProcessPoolExecutor(max_workers=processes) as executor:
+        documents = list(executor.map(_render_chunk, chunks, chunk_shifts))
+    writer = PdfWriter()
+    for document in documents:
+        for page in PdfReader(io.BytesIO(document)).pages:
+            writer.add_page(page)
+    with open(filename, 'wb') as file:
+        writer.write(file)
@@ -0,0 +1,153 @@
+import copy
+import csv
+import json
+import math
+import os
+import tempfile
+from datetime import timedelta
+
+from constraints import CYCLE_DAYS
+from shift_scheduler import (SHIFT_EXPORT_HEADERS, _open_csv, iter_shift_rows, parse_date, parse_work_periods,
+                             schedule_shifts, to_datetime)
+from schedule_cache import request_key
+
+def split_windows(work_periods, window_days=None):
+    """Cut the span of the work periods into (start, end, periods) windows.
+
+    Windows are calendar months, or window_days long when given; periods
+    are the work periods clipped to the window, and windows without any
+    work day are left out.
+    """
+    periods = parse_work_periods(work_periods)
+    if not periods:
+        return []
+    start, end = min(period[0] for period in periods), max(period[1] for period in periods)
+    windows = []
+    while start <= end:
+        if window_days:
+            window_end = start + timedelta(days=window_days - 1)
+        else:
+            window_end = (start.replace(day=28) + timedelta(days=4)).replace(day=1) - timedelta(days=1)
+        window_end = min(window_end, end)
+        clipped = [(max(first, start), min(last, window_end)) for first, last in periods if first <= window_end and last >= start]
+        if clipped:
+            windows.append((start, window_end, clipped))
+        start = window_end + timedelta(days=1)
+    return windows
+
+def _in_window(day, start, end):
+    if isinstance(day, str) and not day.strip():
+        return False
+    return start <= to_datetime(day) <= end
+
+def _window_workers(workers, start, end, first):
+    # schedule_shifts writes to its workers, so every window gets shallow copies holding only the window's dates
+    window_workers = []
+    for worker in workers:
+        window_worker = copy.copy(worker)
+        window_worker.work_dates = list(worker.work_dates)
+        window_worker.obligatory_coverage = [day for day in worker.obligatory_coverage if _in_window(day, start, end)]
+        window_worker.unavailable_dates = [day for day in worker.unavailable_dates if _in_window(day, start, end)]
+        # History before the first window is replayed once; after that it is summed up in the carried state
+        window_worker.previously_assigned_shifts = [
+            (date, job) for date, job in worker.previously_assigned_shifts if date <= end and (first or date >= start)
+        ]
+        window_worker.obligatory_coverage_shifts = {}
+        window_workers.append(window_worker)
+    return window_workers
+
+def carried_state(schedule, start):
+    """State of each worker that the next window starting on start still reads, as plain JSON data.
+
+    A last shift further back than any rule looks is moved up to that
+    limit so the next horizon stays short; shifts in the week that spans
+    the boundary are kept so the weekly cap holds across it.
+    """
+    state = schedule.state
+    arrays = state.roster_arrays
+    horizon = state.horizon
+    span = max(CYCLE_DAYS, math.ceil(max((state.min_distance * 100 / worker.percentage_shifts for worker in state.workers), default=0))) + 1
+    earliest = start - timedelta(days=span)
+    boundary_week = horizon.week_index_of.get(tuple((start - timedelta(days=1)).isocalendar()[:2]))
+    week_label = "{0}-W{1:02d}".format(*(start - timedelta(days=1)).isocalendar()[:2])
+    jobs = list(arrays.job_index)
+    carry = {}
+    for row, worker in enumerate(state.workers):
+        # Carried and replayed shifts before the horizon are only known through the last shift
+        latest = arrays.latest_shift(row)
+        if latest is None and arrays.has_last_shift[row]:
+            latest = int(arrays.last_shift[row])
+        week_count = int(arrays.weekly_counts[row, boundary_week]) if boundary_week is not None else 0
+        last_job = int(arrays.last_job[row])
+        last_weekday = int(arrays.last_weekday[row])
+        carry[worker.identification] = {
+            'last_shift': max(horizon.date(latest), earliest).strftime("%d/%m/%Y") if latest is not None else None,
+            'last_job': jobs[last_job] if last_job != arrays.NO_JOB else None,
+            'last_weekday': last_weekday if last_weekday >= 0 else None,
+            'rotation': arrays.rotation[row].tolist(),
+            'job_counts': dict(zip(jobs, arrays.job_counts[row].tolist())),
+            'weekend_count': int(arrays.weekend_counts[row]),
+            'week_counts': {week_label: week_count} if week_count else {},
+            'quota_balance': worker.shift_quota
+        }
+    return carry
+
+def _write_checkpoint(filename, checkpoint):
+    directory = os.path.dirname(os.path.abspath(filename))
+    fd, tmp_name = tempfile.mkstemp(dir=directory, suffix='.tmp')
+    with os.fdopen(fd, 'w') as file:
+        json.dump(checkpoint, file)
+    os.replace(tmp_name, filename)
+
+def _load_checkpoint(filename, key):
+    if not filename or not os.path.exists(filename):
+        return None
+    with open(filename) as file:
+        checkpoint = json.load(file)
+    return checkpoint if checkpoint.get('key') == key else None
+
+def schedule_rolling(work_periods, holidays, jobs, workers, min_distance, max_shifts_per_week, output, checkpoint=None, window_days=None, constraints=None, cancelled=None):
+    """Schedule long horizons window by window, streaming the shifts to a per-shift CSV.
+
+    Each window is a separate schedule_shifts run that starts from the
+    state the previous one carried forward (see carried_state), so memory
+    depends on the window length rather than the horizon. With a
+    checkpoint filename the carried state and the size of output are
+    saved after every window; a later call with the same inputs resumes
+    after the last finished window. Returns a dict with the number of
+    windows, how many were resumed from the checkpoint, the shifts
+    written and the final carried state.
+    """
+    windows = split_windows(work_periods, window_days)
+    key = request_key(work_periods, holidays, jobs, workers, min_distance, max_shifts_per_week) + f":{window_days or 'month'}:{output}"
+    saved = _load_checkpoint(checkpoint, key) if checkpoint else None
+
+    if saved:
+        done, carry, shifts = saved['windows_done'], saved['carry'], saved['shifts']
+        # Drop anything written after the checkpoint, e.g. by a window that was interrupted
+        os.truncate(output, saved['output_bytes'])
+    else:
+        done, carry, shifts = 0, None, 0
+        with _open_csv(output, 'w') as file:
+            csv.writer(file).writerow(SHIFT_EXPORT_HEADERS)
+
+    for index in range(done, len(windows)):
+        start, end, periods = windows[index]
+        window_workers = _window_workers(workers, start, end, first=index == 0)
+        period_strs = [f"{first.strftime('%d/%m/%Y')}-{last.strftime('%d/%m/%Y')}" for first, last in periods]
+        schedule = schedule_shifts(period_strs, holidays, jobs, window_workers, min_distance, max_shifts_per_week,
+                                   constraints=constraints, carry=carry, cancelled=cancelled)
+
+        # Replayed history before the window was written with an earlier window, or is not part of this run
+        rows = [row for row in iter_shift_rows(schedule) if start <= parse_date(row[0]) <= end]
+        with _open_csv(output, 'a') as file:
+            csv.writer(file).writerows(rows)
+        shifts += len(rows)
+        carry = carried_state(schedule, end + timedelta(days=1))
+        if checkpoint:
+            _write_checkpoint(checkpoint, {
+                'key': key, 'windows_done': index + 1, 'carry': carry, 'shifts': shifts,
+                'output_bytes': os.path.getsize(output)
+            })
+
+    return {'windows': len(windows), 'resumed_windows': done, 'shifts': shifts, 'carry': carry}
@@ -0,0 +1,198 @@
+import hashlib
+import json
+import os
+import pickle
+import tempfile
+from datetime import datetime
+
+import numpy as np
+
+from shift_scheduler import schedule_shifts, parse_work_periods, ScheduleGrid
+
+DEFAULT_CACHE_DIR = os.path.join(os.path.expanduser('~'), '.cache', 'shift_scheduler')
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+# Part of every key; bump it whenever the pickled schedule classes or the scheduling results change
+CACHE_VERSION = 2
+
+def _date_str(value):
+    return value.strftime("%d/%m/%Y") if isinstance(value, datetime) else str(value).strip()
+
+def _date_list(values):
+    return [_date_str(value) for value in values if not isinstance(value, str) or value.strip()]
+
+def _periods(work_periods):
+    return [[_date_str(start), _date_str(end)] for start, end in work_periods]
+
+def normalize_worker(worker, periods=None):
+    """Plain-data record of everything schedule_shifts reads from a worker.
+
+    schedule_shifts fills empty work dates in with the run's periods, so
+    work dates equal to periods (as from _periods) count as empty: the same
+    workers hash the same before and after a run.
+    """
+    work_dates = _periods(worker.work_dates)
+    return {
+        'identification': worker.identification,
+        'work_dates': None if not work_dates or work_dates == periods else work_dates,
+        'percentage': float(worker.percentage_shifts),
+        'group': worker.group,
+        'incompatible_job': list(worker.incompatible_job),
+        'group_incompatibility': list(worker.group_incompatibility),
+        # Obligatory dates are covered in list order, unavailable dates are a set
+        'obligatory_coverage': _date_list(worker.obligatory_coverage),
+        'unavailable_dates': sorted(_date_list(worker.unavailable_dates)),
+        'previously_assigned_shifts': [[_date_str(date), job] for date, job in worker.previously_assigned_shifts]
+    }
+
+def _digest(data):
+    return hashlib.sha256(json.dumps(data, sort_keys=True, separators=(',', ':')).encode('utf-8')).hexdigest()
+
+def roster_key(holidays, jobs, workers, min_distance, max_shifts_per_week, work_periods=None):
+    """Hash of every input except the work periods; worker order matters since it breaks ties.
+
+    work_periods only serve to recognise workers whose work dates a run
+    filled in (see normalize_worker).
+    """
+    periods = _periods(parse_work_periods(work_periods)) if work_periods is not None else None
+    return _digest({
+        'version': CACHE_VERSION,
+        'holidays': sorted(holiday.strip() for holiday in holidays if holiday.strip()),
+        'jobs': list(jobs),
+        'min_distance': min_distance,
+        'max_shifts_per_week': max_shifts_per_week,
+        'workers': [normalize_worker(worker, periods) for worker in workers]
+    })
+
+def request_key(work_periods, holidays, jobs, workers, min_distance, max_shifts_per_week):
+    periods = _periods(parse_work_periods(work_periods))
+    return _digest({'work_periods': periods, 'roster': roster_key(holidays, jobs, workers, min_distance, max_shifts_per_week, work_periods)})
+
+def _period_days(work_periods):
+    return {start.toordinal() + n for start, end in parse_work_periods(work_periods) for n in range((end - start).days + 1)}
+
+class ScheduleCache:
+    """On-disk cache of schedule_shifts results, keyed by a canonical hash of the inputs.
+
+    Entries are pickled files under directory; once their total size goes
+    over max_bytes the least recently used ones are evicted. For each
+    roster (every input but the work periods) the assignments of the
+    latest run are also kept, so a request with reuse_prefix that only
+    changes later periods can be seeded with everything scheduled before
+    the first day that differs.
+    """
+    def __init__(self, directory=DEFAULT_CACHE_DIR, max_bytes=DEFAULT_MAX_BYTES):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, kind, key):
+        return os.path.join(self.directory, f"{kind}-{key}.pkl")
+
+    def _load(self, path):
+        try:
+            with open(path, 'rb') as file:
+                payload = pickle.load(file)
+        except FileNotFoundError:
+            return None
+        except Exception:
+            # Truncated, or written by code whose classes have since changed: a miss, and the entry goes
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            return None
+        os.utime(path)  # Mark as recently used
+        return payload
+
+    def _store(self, path, payload):
+        # Write to a temporary file first so readers never see a partial entry
+        descriptor, temporary_path = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        with os.fdopen(descriptor, 'wb') as file:
+            pickle.dump(payload, file, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(temporary_path, path)
+        self.evict()
+
+    def evict(self):
+        entries = []
+        for name in os.listdir(self.directory):
+            if name.endswith('.pkl'):
+                path = os.path.join(self.directory, name)
+                try:
+                    info = os.stat(path)
+                except OSError:
+                    continue
+                entries.append((info.st_mtime, info.st_size, path))
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            total -= size
+
+    def clear(self):
+        for name in os.listdir(self.directory):
+            if name.endswith('.pkl'):
+                os.remove(os.path.join(self.directory, name))
+
+    def schedule_shifts(self, work_periods, holidays, jobs, workers, min_distance, max_shifts_per_week, reuse_prefix=False):
+        """Cached schedule_shifts: identical requests get what a cold run would return.
+
+        With reuse_prefix, a miss on a known roster replays the cached
+        assignments dated before the first day whose coverage changed and
+        only searches the days after it. Quotas still come from the new
+        periods, so such a result can differ from a cold run after the
+        divergence point; it is cached apart and only ever served to
+        reuse_prefix requests.
+        """
+        key = request_key(work_periods, holidays, jobs, workers, min_distance, max_shifts_per_week)
+        roster = roster_key(holidays, jobs, workers, min_distance, max_shifts_per_week, work_periods)
+        for kind in ('schedule', 'seeded') if reuse_prefix else ('schedule',):
+            payload = self._load(self._path(kind, key))
+            if payload is not None:
+                schedule = payload['schedule']
+                self._restore_workers(schedule, workers)
+                return schedule
+
+        seeds = self._prefix_seeds(roster, work_periods) if reuse_prefix else None
+        schedule = schedule_shifts(work_periods, holidays, jobs, workers, min_distance, max_shifts_per_week, seed_assignments=seeds)
+        self._store(self._path('seeded' if seeds else 'schedule', key), {'schedule': schedule})
+        grid = schedule.grid
+        job_rows, offsets = np.nonzero(grid.assignments != ScheduleGrid.EMPTY)
+        self._store(self._path('prefix', roster), {
+            'days': _period_days(work_periods),
+            'assignments': [(grid.horizon.dates[offset], grid.jobs[job_row], grid.worker_ids[grid.assignments[job_row, offset]])
+                            for job_row, offset in zip(job_rows.tolist(), offsets.tolist())]
+        })
+        return schedule
+
+    def _prefix_seeds(self, roster, work_periods):
+        prefix = self._load(self._path('prefix', roster))
+        if prefix is None:
+            return None
+        days = _period_days(work_periods)
+        changed = days.symmetric_difference(prefix['days'])
+        divergence = min(changed) if changed else None
+        return [(date, job, worker_id) for date, job, worker_id in prefix['assignments']
+                if (divergence is None or date.toordinal() < divergence) and date.toordinal() in days]
+
+    def _restore_workers(self, schedule, workers):
+        # Give the caller's workers the state the cached run left on its own copies
+        state = schedule.state
+        if state is None:
+            return
+        cached = {worker.identification: worker for worker in state.workers}
+        for worker in workers:
+            source = cached.get(worker.identification)
+            if source is not None:
+                worker.work_dates = source.work_dates
+                worker.shift_quota = source.shift_quota
+                worker.weekly_shift_quota = source.weekly_shift_quota
+                worker.obligatory_coverage_shifts = source.obligatory_coverage_shifts
+        state.workers = list(workers)
+
+def cached_schedule_shifts(work_periods, holidays, jobs, workers, min_distance, max_shifts_per_week, cache=None, reuse_prefix=False):
+    """schedule_shifts through the default on-disk cache (or the given ScheduleCache)."""
+    return (cache or ScheduleCache()).schedule_shifts(work_periods, holidays, jobs, workers, min_distance, max_shifts_per_week, reuse_prefix)
@@ -0,0 +1,193 @@
+import numpy as np
+
+from constraints import CYCLE_DAYS
+from shift_scheduler import ScheduleGrid, GroupOccupancy
+
+def _neighbour_gaps(occupied, offset, span):
+    """Days to each worker's nearest shift before and after offset; span + 1 when none is within span."""
+    none = np.full(occupied.shape[0], span + 1)
+    before = occupied[:, max(offset - span, 0):offset]
+    after = occupied[:, offset + 1:offset + 1 + span]
+    gap_before = np.where(before.any(axis=1), 1 + np.argmax(before[:, ::-1], axis=1), none) if before.shape[1] else none
+    gap_after = np.where(after.any(axis=1), 1 + np.argmax(after, axis=1), none) if after.shape[1] else none
+    return gap_before, gap_after
+
+def _fill(state, occupied, offset, job_row):
+    """Fill one freed slot with the best worker the constraints allow; returns the row or None."""
+    arrays = state.roster_arrays
+    adjusted_min_distance = state.min_distance * 100 / arrays.percentage_shifts
+    span = int(max(CYCLE_DAYS, np.ceil(adjusted_min_distance.max(initial=0))))
+    gap_before, gap_after = _neighbour_gaps(occupied, offset, span)
+
+    # Every rule of the run, custom ones included, except those that only look back at the latest shift
+    strict, override = state.constraints.placement_masks(state, offset, job_row)
+    override = override & ~occupied[:, offset]
+    # Unlike the forward greedy pass, a repaired slot has shifts on both sides to respect
+    rejected = np.zeros_like(override)
+    for gap in (gap_before, gap_after):
+        rejected |= gap < adjusted_min_distance
+        rejected |= (gap % 7 == 0) & (gap >= 7) & (gap <= CYCLE_DAYS)
+        rejected |= (arrays.job_counts[:, job_row] > 0) & (gap == 1)
+    strict = strict & override & ~rejected
+
+    for mask in (strict, override):
+        candidates = np.flatnonzero(mask)
+        if candidates.size:
+            # Same preference as the greedy pass: longest rest, most quota left, highest percentage, roster order
+            nearest = np.minimum(gap_before, gap_after)[candidates]
+            best = np.lexsort((candidates, -arrays.percentage_shifts[candidates], -arrays.shift_quota[candidates], -nearest))[0]
+            row = int(candidates[best])
+            state.place(occupied, row, offset, job_row)
+            return row
+    return None
+
+def _rebalance_quotas(state):
+    """Recompute every quota for the current roster, keeping the shifts each worker already has."""
+    active = [worker for worker in state.workers if worker.identification not in state.removed]
+    total_percentage = sum(worker.percentage_shifts for worker in active)
+    for row, worker in enumerate(state.workers):
+        assigned = state.initial_quota[row] - worker.shift_quota
+        if worker.identification in state.removed or not total_percentage:
+            quota = 0
+        else:
+            quota = (worker.percentage_shifts / 100) * state.total_slots / (total_percentage / 100)
+        state.initial_quota[row] = quota
+        worker.shift_quota = quota - assigned
+        state.roster_arrays.shift_quota[row] = worker.shift_quota
+
+def _obligatory_job(state, row, offset):
+    """First job the worker may take on offset without displacing anyone's obligatory shift, or None."""
+    worker = state.workers[row]
+    for job_row, job in enumerate(state.jobs):
+        if worker.is_incompatible_with(job):
+            continue
+        if not state.holds_obligatory(job_row, offset):
+            return job_row
+    return None
+
+def _cover_obligatory(state, occupied, row):
+    """Give the worker a shift on each of their obligatory dates; returns slots freed around them."""
+    availability = state.availability
+    worker = state.workers[row]
+    adjusted_min_distance = state.min_distance * 100 / worker.percentage_shifts
+    # A shift the worker already has on an obligatory date becomes their obligatory shift, so nothing below frees it
+    for offset, job_row in state.shifts_of(row):
+        if availability.obligatory[row, offset]:
+            worker.obligatory_coverage_shifts.setdefault(state.horizon.dates[offset], state.jobs[job_row])
+
+    freed = []
+    skipped = set()
+    while True:
+        # Recomputed after every placement, as the dependent window may have released shifts
+        missing = [offset for offset in np.flatnonzero(availability.obligatory[row] & ~occupied[row] & ~availability.unavailable[row]).tolist()
+                   if offset not in skipped]
+        if not missing:
+            return freed
+        offset = missing[0]
+        job_row = _obligatory_job(state, row, offset)
+        if job_row is None:
+            skipped.add(offset)
+            continue
+        # Like schedule_shifts, obligatory coverage takes the slot over from a regular shift
+        displaced = state.grid.assignments[job_row, offset]
+        if displaced != ScheduleGrid.EMPTY:
+            state.release(occupied, int(displaced), offset, job_row)
+        state.place(occupied, row, offset, job_row, obligatory=True)
+        # Dependent window: the worker's other regular shifts now too close to the obligatory one
+        for other_offset, other_job_row in state.shifts_of(row):
+            date = state.horizon.dates[other_offset]
+            if other_offset != offset and abs(other_offset - offset) < adjusted_min_distance and date not in worker.obligatory_coverage_shifts:
+                state.release(occupied, row, other_offset, other_job_row)
+                freed.append((other_offset, other_job_row))
+
+def _refill(state, occupied, freed):
+    in_periods = state.period_mask()
+    for offset, job_row in sorted(set(freed)):
+        if in_periods[offset] and state.grid.assignments[job_row, offset] == ScheduleGrid.EMPTY:
+            _fill(state, occupied, offset, job_row)
+
+def repair_worker_dates(schedule, worker_id, work_dates=None, unavailable_dates=None, obligatory_coverage=None):
+    """Apply an edit to one worker's dates to a schedule returned by schedule_shifts.
+
+    Arguments left as None keep their current value. Only the worker's
+    shifts that the edit invalidates are freed, plus their regular shifts
+    inside the min-distance window of a new obligatory date; those slots
+    are refilled from the run's trackers and everything else is kept.
+    Dates outside the original horizon are ignored. Returns the list of
+    (job, date_str, previous worker id, new worker id) slot changes.
+    """
+    state = schedule.state
+    if worker_id in state.removed:
+        raise ValueError(f"Worker {worker_id} was removed from the roster")
+    row = state.grid.worker_index[worker_id]
+    worker = state.workers[row]
+    if work_dates is not None:
+        worker.work_dates = work_dates if work_dates else state.work_periods
+    if unavailable_dates is not None:
+        worker.unavailable_dates = unavailable_dates
+    if obligatory_coverage is not None:
+        worker.obligatory_coverage = obligatory_coverage
+    state.availability.compile_row(row, worker)
+
+    before = state.grid.assignments.copy()
+    occupied = state.occupancy()
+    availability = state.availability
+    freed = []
+    for offset, job_row in state.shifts_of(row):
+        obligatory_shift = worker.obligatory_coverage_shifts.get(state.horizon.dates[offset]) == state.jobs[job_row]
+        allowed = availability.obligatory[row, offset] if obligatory_shift else availability.in_work_period[row, offset]
+        if availability.unavailable[row, offset] or not allowed:
+            state.release(occupied, row, offset, job_row)
+            freed.append((offset, job_row))
+    freed.extend(_cover_obligatory(state, occupied, row))
+    _refill(state, occupied, freed)
+    return state.changes(before)
+
+def repair_remove_worker(schedule, worker_id):
+    """Take a worker off the roster, refilling the slots they held in the work periods."""
+    state = schedule.state
+    row = state.grid.worker_index[worker_id]
+    before = state.grid.assignments.copy()
+    occupied = state.occupancy()
+    freed = state.shifts_of(row)
+    for offset, job_row in freed:
+        state.release(occupied, row, offset, job_row)
+    # The row stays so grid indices remain valid; it just never qualifies again
+    state.removed.add(worker_id)
+    state.availability.unavailable[row] = True
+    state.availability.in_work_period[row] = False
+    _rebalance_quotas(state)
+    _refill(state, occupied, freed)
+    return state.changes(before)
+
+def repair_add_worker(schedule, worker):
+    """Add a worker to the roster of an existing schedule.
+
+    Quotas are recomputed for the larger roster, the newcomer gets their
+    obligatory dates and becomes a candidate for any slot freed by later
+    repairs; other assignments are left as they are.
+    """
+    state = schedule.state
+    worker_id = worker.identification
+    if worker_id in state.grid.worker_index:
+        raise ValueError(f"Worker {worker_id} is already on the roster")
+    if not worker.work_dates:
+        worker.work_dates = state.work_periods
+    worker.shift_quota = 0
+    row = len(state.workers)
+    state.workers.append(worker)
+    state.grid.worker_ids.append(worker_id)
+    state.grid.worker_index[worker_id] = row
+    state.initial_quota = np.append(state.initial_quota, 0.0)
+
+    state.availability.add_row(worker)
+    state.group_occupancy = GroupOccupancy.from_grid(state.grid, state.workers)
+    state.roster_arrays.add_row(worker)
+    _rebalance_quotas(state)
+    # The rules hold per-row tables, e.g. job incompatibility, that now need the new row
+    state.constraints.compile(state)
+
+    before = state.grid.assignments.copy()
+    occupied = state.occupancy()
+    _refill(state, occupied, _cover_obligatory(state, occupied, row))
+    return state.changes(before)
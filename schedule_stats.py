@@ -0,0 +1,214 @@
+import csv
+import json
+import sys
+
+import numpy as np
+
+from instrumentation import instrumentation
+from shift_scheduler import ScheduleGrid, _open_csv, is_holiday, is_weekend, parse_date
+
+# (CSV/text header, JSON key) of the per-worker columns; one 'Job <name>' column per job follows
+COLUMNS = [
+    ('Worker', 'worker'),
+    ('Group', 'group'),
+    ('Shifts', 'shifts'),
+    ('Quota', 'quota'),
+    ('Quota Left', 'quota_left'),
+    ('Weekend/Holiday', 'weekend_holiday'),
+    ('Min Gap', 'min_gap'),
+    ('Mean Gap', 'mean_gap'),
+    ('Max Per Week', 'max_per_week')
+]
+
+class ScheduleStatistics:
+    """Fairness metrics of a schedule, one array entry per worker.
+
+    shifts and job_counts count every shift in the schedule; quota is the
+    quota the run started from and quota_left what is still owed (NaN when
+    the schedule carries no scheduling state). min_gap and mean_gap are
+    days between consecutive shifts (NaN below two shifts) and
+    max_per_week is the busiest ISO week.
+    """
+    def __init__(self, worker_ids, groups, jobs, shifts, job_counts, weekend_holiday, min_gap, mean_gap, max_per_week, quota, quota_left):
+        self.worker_ids = worker_ids
+        self.groups = groups
+        self.jobs = jobs
+        self.shifts = shifts
+        self.job_counts = job_counts
+        self.weekend_holiday = weekend_holiday
+        self.min_gap = min_gap
+        self.mean_gap = mean_gap
+        self.max_per_week = max_per_week
+        self.quota = quota
+        self.quota_left = quota_left
+
+    def __len__(self):
+        return len(self.worker_ids)
+
+    def summary(self):
+        """Roster-wide totals and spreads."""
+        deviation = np.abs(self.quota_left)
+        return {
+            'workers': len(self),
+            'shifts': int(self.shifts.sum()),
+            'shifts_per_job': dict(zip(self.jobs, self.job_counts.sum(axis=0).tolist())),
+            'quota_deviation': float(np.nansum(deviation)) if not np.isnan(deviation).all() else None,
+            'weekend_holiday_std': float(self.weekend_holiday.std()) if len(self) else 0.0,
+            'min_gap': _number(np.nanmin(self.min_gap)) if not np.isnan(self.min_gap).all() else None,
+            'max_per_week': int(self.max_per_week.max(initial=0))
+        }
+
+    def headers(self):
+        return [header for header, _ in COLUMNS] + [f"Job {job}" for job in self.jobs]
+
+    def rows(self):
+        """Yield one list of plain values per worker, in headers() order; NaN becomes None."""
+        columns = [self.shifts.tolist(), self.quota.tolist(), self.quota_left.tolist(), self.weekend_holiday.tolist(),
+                   self.min_gap.tolist(), self.mean_gap.tolist(), self.max_per_week.tolist()]
+        job_counts = self.job_counts.tolist()
+        for row, (worker_id, group) in enumerate(zip(self.worker_ids, self.groups)):
+            yield [worker_id, group] + [_number(column[row]) for column in columns] + job_counts[row]
+
+def _number(value):
+    if value != value:  # NaN
+        return None
+    return round(value, 2) if isinstance(value, float) else value
+
+def _gaps(rows, days, num_workers):
+    # Sorted by worker then day, so consecutive entries of one worker are their consecutive shifts
+    order = np.lexsort((days, rows))
+    rows, days = rows[order], days[order]
+    same = rows[1:] == rows[:-1]
+    gaps = np.diff(days)[same]
+    owners = rows[1:][same]
+    min_gap = np.full(num_workers, np.inf)
+    np.minimum.at(min_gap, owners, gaps)
+    min_gap[np.isinf(min_gap)] = np.nan
+    counts = np.bincount(owners, minlength=num_workers)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        mean_gap = np.bincount(owners, weights=gaps, minlength=num_workers) / counts
+    return min_gap, mean_gap
+
+def _grid_shifts(schedule):
+    grid = schedule.grid
+    horizon = grid.horizon
+    job_rows, offsets = np.nonzero(grid.assignments != ScheduleGrid.EMPTY)
+    rows = grid.assignments[job_rows, offsets].astype(np.int64)
+    weeks = np.asarray(horizon.week_indices, dtype=np.int64)[offsets]
+    weekend = np.asarray(horizon.weekend_or_holiday, dtype=bool)[offsets]
+    return list(grid.worker_ids), list(grid.jobs), rows, job_rows.astype(np.int64), offsets.astype(np.int64), weeks, weekend
+
+def _mapping_shifts(schedule, worker_ids, holidays):
+    # Plain job -> {date_str: worker id} schedules; each distinct date is parsed once
+    worker_index = {worker_id: row for row, worker_id in enumerate(worker_ids)}
+    holidays_set = {holiday.strip() for holiday in holidays}
+    jobs = list(schedule)
+    calendar = {}
+    week_index = {}
+    rows, job_rows, days, weeks, weekend = [], [], [], [], []
+    for job_row, job in enumerate(jobs):
+        for date_str, worker_id in schedule[job].items():
+            if date_str not in calendar:
+                date = parse_date(date_str)
+                week = week_index.setdefault(tuple(date.isocalendar()[:2]), len(week_index))
+                calendar[date_str] = (date.toordinal(), week, is_weekend(date) or is_holiday(date_str, holidays_set))
+            if worker_id not in worker_index:
+                worker_index[worker_id] = len(worker_ids)
+                worker_ids.append(worker_id)
+            day, week, weekend_or_holiday = calendar[date_str]
+            rows.append(worker_index[worker_id])
+            job_rows.append(job_row)
+            days.append(day)
+            weeks.append(week)
+            weekend.append(weekend_or_holiday)
+    return (worker_ids, jobs, np.array(rows, dtype=np.int64), np.array(job_rows, dtype=np.int64), np.array(days, dtype=np.int64),
+            np.array(weeks, dtype=np.int64), np.array(weekend, dtype=bool))
+
+def schedule_statistics(schedule, workers=None, holidays=()):
+    """Compute the per-worker ScheduleStatistics of a schedule.
+
+    Schedules returned by schedule_shifts are read straight from their grid
+    and state, including workers without any shift. Plain dict schedules
+    need workers for groups and quotas and holidays for the
+    weekend/holiday count.
+    """
+    state = getattr(schedule, 'state', None)
+    if getattr(schedule, 'grid', None) is not None:
+        worker_ids, jobs, rows, job_rows, days, weeks, weekend = _grid_shifts(schedule)
+    else:
+        worker_ids = [worker.identification for worker in workers or ()]
+        worker_ids, jobs, rows, job_rows, days, weeks, weekend = _mapping_shifts(schedule, worker_ids, holidays)
+    num_workers = len(worker_ids)
+
+    if workers is None and state is not None:
+        workers = state.workers
+    by_id = {worker.identification: worker for worker in workers or ()}
+    groups = [by_id[worker_id].group if worker_id in by_id else '' for worker_id in worker_ids]
+    if state is not None:
+        quota, quota_left = np.asarray(state.initial_quota, dtype=float), state.roster_arrays.shift_quota.copy()
+    else:
+        quota = np.full(num_workers, np.nan)
+        quota_left = np.array([by_id[worker_id].shift_quota if worker_id in by_id else np.nan for worker_id in worker_ids], dtype=float)
+
+    shifts = np.bincount(rows, minlength=num_workers)
+    job_counts = np.bincount(rows * len(jobs) + job_rows, minlength=num_workers * len(jobs)).reshape(num_workers, len(jobs))
+    weekend_holiday = np.bincount(rows[weekend], minlength=num_workers)
+    num_weeks = int(weeks.max()) + 1 if weeks.size else 1
+    max_per_week = np.bincount(rows * num_weeks + weeks, minlength=num_workers * num_weeks).reshape(num_workers, num_weeks).max(axis=1)
+    min_gap, mean_gap = _gaps(rows, days, num_workers)
+    return ScheduleStatistics(worker_ids, groups, jobs, shifts, job_counts, weekend_holiday, min_gap, mean_gap, max_per_week, quota, quota_left)
+
+def iter_text_lines(stats):
+    """Yield the report as aligned text lines, a header then one line per worker."""
+    headers = stats.headers()
+    rows = stats.rows()
+    widths = [max(len(header), 8) for header in headers]
+    widths[0] = max([widths[0]] + [len(str(worker_id)) for worker_id in stats.worker_ids])
+    yield '  '.join(header.ljust(width) for header, width in zip(headers, widths)).rstrip() + '\n'
+    for row in rows:
+        cells = ['' if value is None else str(value) for value in row]
+        yield '  '.join(cell.ljust(width) for cell, width in zip(cells, widths)).rstrip() + '\n'
+    summary = stats.summary()
+    yield f"\n{summary['workers']} workers, {summary['shifts']} shifts, weekend/holiday std {summary['weekend_holiday_std']:.2f}\n"
+
+def write_csv(stats, file):
+    writer = csv.writer(file)
+    writer.writerow(stats.headers())
+    writer.writerows(stats.rows())
+
+def write_json(stats, file):
+    """Write {"summary": ..., "workers": [...]} one worker per line, without building the whole document first."""
+    keys = [key for _, key in COLUMNS]
+    file.write('{"summary": ' + json.dumps(stats.summary()) + ', "workers": [')
+    jobs = stats.jobs
+    for index, row in enumerate(stats.rows()):
+        record = dict(zip(keys, row[:len(keys)]))
+        record['jobs'] = dict(zip(jobs, row[len(keys):]))
+        file.write(('\n' if not index else ',\n') + json.dumps(record))
+    file.write('\n]}\n')
+
+@instrumentation.timed('export_stats')
+def export_statistics(schedule, filename, output_format=None, workers=None, holidays=()):
+    """Write the statistics report of a schedule as text, CSV or JSON.
+
+    The format follows output_format, or else the extension of filename
+    (.csv, .json, anything else is text; a trailing .gz compresses). A
+    filename of '-' writes to standard output.
+    """
+    stats = schedule_statistics(schedule, workers, holidays)
+    name = str(filename)
+    if output_format is None:
+        stem = name[:-3] if name.endswith('.gz') else name
+        output_format = 'csv' if stem.endswith('.csv') else 'json' if stem.endswith('.json') else 'text'
+    file = sys.stdout if name == '-' else _open_csv(filename, 'w')
+    try:
+        if output_format == 'csv':
+            write_csv(stats, file)
+        elif output_format == 'json':
+            write_json(stats, file)
+        else:
+            file.writelines(iter_text_lines(stats))
+    finally:
+        if file is not sys.stdout:
+            file.close()
+    return stats
@@ -1,46 +1,142 @@
+import copy
 import csv
+import gzip
 import logging
 from datetime import datetime, timedelta
+import heapq
 from collections import defaultdict
+from collections.abc import Mapping
+from functools import lru_cache
+from itertools import islice
+
+import numpy as np
+
+from instrumentation import instrumentation
+from constraints import ConstraintEngine, default_constraints
+from worker import Worker
+
+@lru_cache(maxsize=65536)
+def parse_date(date_str):
+    # The same few hundred dates repeat across thousands of roster rows, so each string is parsed once
+    return datetime.strptime(date_str.strip(), "%d/%m/%Y")
+
+def _split_row(row):
+    """Split the multi-value columns of a CSV row into stripped fragments."""
+    work_periods = []
+    for period in row['Work Dates'].split(','):
+        if '-' in period:
+            start, end = period.split('-')
+            work_periods.append((start.strip(), end.strip()))
+    shift_dates = (row.get('Assigned Shifts') or '').split(',')
+    shift_jobs = (row.get('Assigned Jobs') or '').split(',')
+    assigned = [(date.strip(), job.strip()) for date, job in zip(shift_dates, shift_jobs) if date.strip() and job.strip()]
+    obligatory = [date.strip() for date in row['Obligatory Coverage'].split(',') if date.strip()]
+    unavailable = [date.strip() for date in row['Unavailable Dates'].split(',') if date.strip()]
+    return work_periods, assigned, obligatory, unavailable
+
+def _parse_chunk(rows, on_error):
+    # Split every row first so the chunk's distinct date strings are parsed in one pass
+    split_rows = []
+    fragments = set()
+    for row_number, row in rows:
+        try:
+            work_periods, assigned, obligatory, unavailable = _split_row(row)
+        except (KeyError, ValueError, AttributeError) as e:
+            on_error(row_number, row, e)
+            continue
+        fragments.update(date for period in work_periods for date in period)
+        fragments.update(date for date, _ in assigned)
+        fragments.update(obligatory)
+        fragments.update(unavailable)
+        split_rows.append((row_number, row, work_periods, assigned, obligatory, unavailable))
+    dates = {}
+    for fragment in fragments:
+        try:
+            dates[fragment] = parse_date(fragment)
+        except ValueError:
+            pass  # Reported against the rows that use it
 
-logging.basicConfig(level=logging.DEBUG)
-
-class Worker:
-    def __init__(self, identification, work_dates=None, percentage=100.0, group='1', incompatible_job=None, group_incompatibility=None, obligatory_coverage=None, unavailable_dates=None, previously_assigned_shifts=None):
-        self.identification = identification
-        self.work_dates = work_dates if work_dates else []
-        self.percentage_shifts = float(percentage) if percentage else 100.0
-        self.group = group if group else '1'
-        self.incompatible_job = incompatible_job if incompatible_job else []
-        self.group_incompatibility = group_incompatibility if group_incompatibility else []
-        self.obligatory_coverage = obligatory_coverage if obligatory_coverage else []
-        self.unavailable_dates = unavailable_dates if unavailable_dates else []
-        self.previously_assigned_shifts = previously_assigned_shifts if previously_assigned_shifts else []
-
-def import_workers_from_csv(filename):
     workers = []
-    with open(filename, mode='r') as file:
-        reader = csv.DictReader(file)
-        logging.debug(f"CSV Headers: {reader.fieldnames}")
-        for row in reader:
-            logging.debug(f"CSV Row: {row}")
-            work_dates = [(datetime.strptime(start.strip(), "%d/%m/%Y"), datetime.strptime(end.strip(), "%d/%m/%Y")) 
-                          for period in row['Work Dates'].split(',') if '-' in period for start, end in [period.split('-')]]
-            previously_assigned_shifts = [(datetime.strptime(date.strip(), "%d/%m/%Y"), job.strip()) 
-                                          for date, job in zip(row['Assigned Shifts'].split(','), row['Assigned Jobs'].split(',')) if date and job]
-            worker = Worker(
+    for row_number, row, work_periods, assigned, obligatory, unavailable in split_rows:
+        try:
+            # Obligatory and unavailable dates stay strings on the worker, but a bad one fails the row here, not the run
+            for date in obligatory + unavailable:
+                if date not in dates:
+                    raise ValueError(f"invalid date {date!r}")
+            workers.append(Worker(
                 identification=row['Identification'],
-                work_dates=work_dates,
+                work_dates=[(dates[start], dates[end]) for start, end in work_periods],
                 percentage=float(row['Percentage']) if row['Percentage'] else 100.0,
                 group=row['Group'],
                 incompatible_job=row['Incompatible Job'].split(','),
                 group_incompatibility=row['Group Incompatibility'].split(','),
-                obligatory_coverage=row['Obligatory Coverage'].split(','),
-                unavailable_dates=row['Unavailable Dates'].split(','),
-                previously_assigned_shifts=previously_assigned_shifts
-            )
-            workers.append(worker)
+                obligatory_coverage=obligatory,
+                unavailable_dates=unavailable,
+                previously_assigned_shifts=[(dates[date], job) for date, job in assigned]
+            ))
+        except KeyError as e:
+            on_error(row_number, row, ValueError(f"invalid date {e}") if e.args and e.args[0] in fragments else e)
+        except (ValueError, AttributeError) as e:
+            on_error(row_number, row, e)
     return workers
+
+def _log_row_error(row_number, row, error):
+    logging.error(f"Skipping malformed CSV row {row_number}: {error!r}")
+
+SHIFT_EXPORT_HEADERS = ['Date', 'Job', 'Worker', 'Group', 'Weekend/Holiday']
+
+def _open_csv(filename, mode):
+    # Files ending in .gz are compressed transparently
+    if str(filename).endswith('.gz'):
+        return gzip.open(filename, mode + 't', newline='')
+    return open(filename, mode=mode, newline='')
+
+def _shift_history_chunks(numbered_rows, chunk_size, on_error):
+    # A per-shift export lists each worker's shifts across the whole file, so workers are complete only at the end
+    workers = {}
+    for row_number, row in numbered_rows:
+        try:
+            shift = (parse_date(row['Date']), row['Job'].strip())
+            worker_id = row['Worker'].strip()
+        except (KeyError, ValueError, AttributeError) as e:
+            on_error(row_number, row, e)
+            continue
+        worker = workers.get(worker_id)
+        if worker is None:
+            worker = workers[worker_id] = Worker(worker_id, group=(row.get('Group') or '').strip())
+        worker.previously_assigned_shifts.append(shift)
+    workers = list(workers.values())
+    for start in range(0, len(workers), chunk_size):
+        yield workers[start:start + chunk_size]
+
+def iter_workers_from_csv(filename, chunk_size=1000, on_error=None):
+    """Stream workers from a roster CSV as lists of up to chunk_size Worker objects.
+
+    Malformed rows are skipped and reported to on_error(row_number,
+    row, exception), which by default logs them; the import carries on
+    with the next row. A per-shift file written by export_schedule_to_csv
+    is read back as workers whose previously_assigned_shifts hold its
+    shifts.
+    """
+    on_error = on_error or _log_row_error
+    with _open_csv(filename, 'r') as file:
+        reader = csv.DictReader(file)
+        instrumentation.trace("CSV Headers: %s", reader.fieldnames)
+        # Row numbers count the header as row 1, like a spreadsheet
+        numbered_rows = enumerate(reader, start=2)
+        fieldnames = reader.fieldnames or []
+        if 'Identification' not in fieldnames and {'Date', 'Job', 'Worker'} <= set(fieldnames):
+            yield from _shift_history_chunks(numbered_rows, chunk_size, on_error)
+            return
+        while True:
+            rows = list(islice(numbered_rows, chunk_size))
+            if not rows:
+                break
+            yield _parse_chunk(rows, on_error)
+
+@instrumentation.timed('import_csv')
+def import_workers_from_csv(filename, on_error=None):
+    return [worker for chunk in iter_workers_from_csv(filename, on_error=on_error) for worker in chunk]
     
 def calculate_shift_quota(workers, total_days, jobs_per_day):
     total_percentage = sum(worker.percentage_shifts for worker in workers)
@@ -63,101 +159,622 @@ def is_holiday(date_str, holidays_set):
     else:
         return False
 
-def can_work_on_date(worker, date, last_shift_dates, weekend_tracker, holidays_set, weekly_tracker, job, job_count, min_distance, max_shifts_per_week, override=False, schedule=None, workers=None):
+def to_datetime(value):
+    # Dates arrive either already parsed or as "dd/mm/YYYY" strings depending on the Worker source
+    if isinstance(value, datetime):
+        return value
+    return datetime.strptime(value.strip(), "%d/%m/%Y")
+
+class Horizon:
+    """Calendar table of a scheduling run, one row per integer day offset.
+
+    Each row holds the date, its "dd/mm/YYYY" string, the weekday, the
+    (ISO year, ISO week) key with a dense week index, and whether the day
+    counts as weekend or holiday. It is built once per run so the hot path
+    never formats or re-derives calendar facts.
+    """
+    def __init__(self, start_date, end_date, holidays_set=()):
+        self.start_date = start_date
+        self.end_date = end_date
+        self.num_days = max((end_date - start_date).days + 1, 0)
+        self._start_ordinal = start_date.toordinal()
+        self.dates = [start_date + timedelta(n) for n in range(self.num_days)]
+        self.date_strs = [date.strftime("%d/%m/%Y") for date in self.dates]
+        self._offsets_by_str = {date_str: offset for offset, date_str in enumerate(self.date_strs)}
+        self.weekdays = [date.weekday() for date in self.dates]
+        self.week_keys = [tuple(date.isocalendar()[:2]) for date in self.dates]
+        self.week_index_of = {}
+        for week_key in self.week_keys:
+            self.week_index_of.setdefault(week_key, len(self.week_index_of))
+        self.week_indices = [self.week_index_of[week_key] for week_key in self.week_keys]
+        self.num_weeks = len(self.week_index_of)
+        holidays_set = {holiday.strip() for holiday in holidays_set if isinstance(holiday, str)}
+        self.weekend_or_holiday = [is_weekend(date) or is_holiday(date_str, holidays_set) for date, date_str in zip(self.dates, self.date_strs)]
+
+    def offset(self, date):
+        return date.toordinal() - self._start_ordinal
+
+    def offset_of_str(self, date_str):
+        # Returns None for strings that are not a day of the horizon
+        return self._offsets_by_str.get(date_str.strip()) if isinstance(date_str, str) else None
+
+    def date(self, offset):
+        return self.start_date + timedelta(offset)
+
+    def __contains__(self, date):
+        return 0 <= self.offset(date) < self.num_days
+
+class AvailabilityMap:
+    """Per-worker boolean arrays, indexed by day offset, compiled once per run.
+
+    Row ``i`` belongs to ``workers[i]``. Dates outside the horizon, and
+    workers without a row, are not represented: lookups for them return
+    None, which callers read as False, so such a date is neither
+    unavailable nor obligatory and lies outside the work period. Nothing
+    falls back to the date lists on the worker.
+    """
+    def __init__(self, workers, horizon):
+        self.horizon = horizon
+        self.rows = {worker.identification: row for row, worker in enumerate(workers)}
+        shape = (len(workers), horizon.num_days)
+        self.in_work_period = np.zeros(shape, dtype=bool)
+        self.unavailable = np.zeros(shape, dtype=bool)
+        self.obligatory = np.zeros(shape, dtype=bool)
+        for row, worker in enumerate(workers):
+            self.compile_row(row, worker)
+
+    def compile_row(self, row, worker):
+        """(Re)build the arrays of one worker, e.g. after their dates were edited."""
+        self.rows[worker.identification] = row
+        for table in (self.in_work_period, self.unavailable, self.obligatory):
+            table[row] = False
+        for start_date, end_date in worker.work_dates:
+            first = max(self.horizon.offset(start_date), 0)
+            last = min(self.horizon.offset(end_date), self.horizon.num_days - 1)
+            if first <= last:
+                self.in_work_period[row, first:last + 1] = True
+        self._mark(self.unavailable[row], worker.unavailable_dates)
+        self._mark(self.obligatory[row], worker.obligatory_coverage)
+
+    def add_row(self, worker):
+        """Grow the arrays by one row for a worker joining the roster; returns the row."""
+        row = self.in_work_period.shape[0]
+        self.in_work_period = np.vstack([self.in_work_period, np.zeros((1, self.horizon.num_days), dtype=bool)])
+        self.unavailable = np.vstack([self.unavailable, np.zeros((1, self.horizon.num_days), dtype=bool)])
+        self.obligatory = np.vstack([self.obligatory, np.zeros((1, self.horizon.num_days), dtype=bool)])
+        self.compile_row(row, worker)
+        return row
+
+    def _mark(self, days, dates):
+        for day in dates:
+            if isinstance(day, str) and not day.strip():
+                continue
+            offset = self.horizon.offset(to_datetime(day))
+            if 0 <= offset < self.horizon.num_days:
+                days[offset] = True
+
+    def _lookup(self, table, worker, date):
+        row = self.rows.get(worker.identification)
+        offset = self.horizon.offset(date)
+        if row is None or not 0 <= offset < self.horizon.num_days:
+            return None
+        return bool(table[row, offset])
+
+    def is_unavailable(self, worker, date):
+        return self._lookup(self.unavailable, worker, date)
+
+    def is_in_work_period(self, worker, date):
+        return self._lookup(self.in_work_period, worker, date)
+
+    def is_obligatory(self, worker, date):
+        return self._lookup(self.obligatory, worker, date)
+
+def build_horizon(work_periods, workers, jobs, holidays_set=(), extra_dates=()):
+    """Smallest horizon covering the work periods, obligatory dates, previously assigned shifts and extra_dates."""
+    bounds = [date for period in work_periods for date in period]
+    bounds.extend(extra_dates)
+    for worker in workers:
+        bounds.extend(to_datetime(day) for day in worker.obligatory_coverage if not isinstance(day, str) or day.strip())
+        bounds.extend(date for date, job in worker.previously_assigned_shifts if job in jobs)
+    if not bounds:
+        # Nothing to schedule: an empty horizon starting today
+        today = datetime.combine(datetime.today(), datetime.min.time())
+        return Horizon(today, today - timedelta(days=1))
+    return Horizon(min(bounds), max(bounds), holidays_set)
+
+def compile_availability(workers, horizon):
+    """Build the AvailabilityMap of the workers over the horizon."""
+    return AvailabilityMap(workers, horizon)
+
+class ScheduleGrid:
+    """Dense jobs x days array of worker indices; EMPTY marks an unfilled slot."""
+    EMPTY = -1
+
+    def __init__(self, jobs, workers, horizon):
+        self.jobs = list(jobs)
+        self.job_index = {job: row for row, job in enumerate(self.jobs)}
+        self.worker_ids = [worker.identification for worker in workers]
+        self.worker_index = {worker_id: index for index, worker_id in enumerate(self.worker_ids)}
+        self.horizon = horizon
+        self.assignments = np.full((len(self.jobs), horizon.num_days), self.EMPTY, dtype=np.int32)
+
+    def assign(self, job, date, worker_id):
+        self.assignments[self.job_index[job], self.horizon.offset(date)] = self.worker_index[worker_id]
+
+    def unassign(self, job, date):
+        self.assignments[self.job_index[job], self.horizon.offset(date)] = self.EMPTY
+
+    def is_filled(self, job, date):
+        return self.assignments[self.job_index[job], self.horizon.offset(date)] != self.EMPTY
+
+    def worker_at(self, job, date):
+        index = self.assignments[self.job_index[job], self.horizon.offset(date)]
+        return None if index == self.EMPTY else self.worker_ids[index]
+
+class JobScheduleView(Mapping):
+    """Read-only date_str -> worker id mapping for one job row of a ScheduleGrid."""
+    def __init__(self, grid, row):
+        self._grid = grid
+        self._row = grid.assignments[row]
+
+    def __getitem__(self, date_str):
+        offset = self._grid.horizon.offset_of_str(date_str)
+        if offset is None or self._row[offset] == ScheduleGrid.EMPTY:
+            raise KeyError(date_str)
+        return self._grid.worker_ids[self._row[offset]]
+
+    def __iter__(self):
+        date_strs = self._grid.horizon.date_strs
+        for offset in np.flatnonzero(self._row != ScheduleGrid.EMPTY):
+            yield date_strs[offset]
+
+    def __len__(self):
+        return int(np.count_nonzero(self._row != ScheduleGrid.EMPTY))
+
+    def __repr__(self):
+        return repr(dict(self.items()))
+
+class ScheduleView(Mapping):
+    """Read-only schedule[job][date_str] -> worker id view over a ScheduleGrid.
+
+    Only jobs with at least one assigned shift are listed, matching the
+    defaultdict(dict) the scheduler used to return.
+    """
+    def __init__(self, grid):
+        self.grid = grid
+        self.state = None
+
+    def __getitem__(self, job):
+        row = self.grid.job_index.get(job)
+        if row is None or not (self.grid.assignments[row] != ScheduleGrid.EMPTY).any():
+            raise KeyError(job)
+        return JobScheduleView(self.grid, row)
+
+    def __iter__(self):
+        filled = (self.grid.assignments != ScheduleGrid.EMPTY).any(axis=1)
+        return (job for job, has_shifts in zip(self.grid.jobs, filled) if has_shifts)
+
+    def __len__(self):
+        return int((self.grid.assignments != ScheduleGrid.EMPTY).any(axis=1).sum())
+
+    def __repr__(self):
+        return repr({job: dict(shifts) for job, shifts in self.items()})
+
+    def copy(self):
+        """Independent copy of the schedule and its state, e.g. to try repairs or a local search on.
+
+        The workers, grid and tracker arrays are copied; the calendar is
+        read-only and shared.
+        """
+        return copy.deepcopy(self, {id(self.grid.horizon): self.grid.horizon})
+
+class GroupOccupancy:
+    """Per-day count of workers of each group already on shift.
+
+    Groups are interned to column indices once per run, so a group
+    incompatibility check is a handful of array lookups for the day instead
+    of a scan over every job's schedule and every worker.
+    """
+    def __init__(self, workers, horizon):
+        self.horizon = horizon
+        self.workers_by_id = {worker.identification: worker for worker in workers}
+        self.group_index = {}
+        for worker in workers:
+            self.group_index.setdefault(worker.group, len(self.group_index))
+        self.counts = np.zeros((horizon.num_days, len(self.group_index)), dtype=np.int32)
+        # Incompatible groups nobody belongs to can never conflict and are dropped here
+        self.incompatible_groups = {
+            worker.identification: [self.group_index[group] for group in worker.group_incompatibility if group in self.group_index]
+            for worker in workers
+        }
+        self.incompatibility_matrix = np.zeros((len(workers), len(self.group_index)), dtype=bool)
+        for row, worker in enumerate(workers):
+            self.incompatibility_matrix[row, self.incompatible_groups[worker.identification]] = True
+
+    @classmethod
+    def from_grid(cls, grid, workers):
+        occupancy = cls(workers, grid.horizon)
+        for job_row in grid.assignments:
+            for offset in np.flatnonzero(job_row != ScheduleGrid.EMPTY):
+                worker = occupancy.workers_by_id[grid.worker_ids[job_row[offset]]]
+                occupancy.counts[offset, occupancy.group_index[worker.group]] += 1
+        return occupancy
+
+    def _slot(self, worker, date):
+        offset = self.horizon.offset(date)
+        if not 0 <= offset < self.horizon.num_days or worker.group not in self.group_index:
+            return None
+        return offset, self.group_index[worker.group]
+
+    def add(self, worker, date):
+        slot = self._slot(worker, date)
+        if slot:
+            self.counts[slot] += 1
+
+    def remove(self, worker, date):
+        slot = self._slot(worker, date)
+        if slot:
+            self.counts[slot] -= 1
+
+    def conflicts(self, worker, date):
+        offset = self.horizon.offset(date)
+        if not 0 <= offset < self.horizon.num_days:
+            return False
+        day_counts = self.counts[offset]
+        return any(day_counts[group] for group in self.incompatible_groups.get(worker.identification, ()))
+
+    def conflict_mask(self, offset):
+        """Boolean row per worker: True where a group they are incompatible with is on shift that day."""
+        return self.incompatibility_matrix[:, self.counts[offset] > 0].any(axis=1)
+
+class RosterArrays:
+    """Per-run tracker state of every worker as typed arrays, one row per worker.
+
+    Rows follow the roster order and job columns the order of jobs. Besides
+    the counters the rules read (last shift, per-job, weekly and weekend
+    shifts, quota left) it holds the job and weekday rotation the greedy
+    pass settles ties with, and how many shifts each worker has on each day
+    of the horizon. assign_worker_to_shift and unassign_worker_from_shift
+    keep it up to date, so a whole roster can be checked for a slot with a
+    few array operations.
+    """
+    NO_JOB = -1
+
+    def __init__(self, workers, jobs, horizon):
+        self.horizon = horizon
+        self.rows = {worker.identification: row for row, worker in enumerate(workers)}
+        self.job_index = {job: column for column, job in enumerate(jobs)}
+        num_workers = len(workers)
+        self.shift_quota = np.array([worker.shift_quota for worker in workers], dtype=float)
+        self.percentage_shifts = np.array([worker.percentage_shifts for worker in workers], dtype=float)
+        self.has_last_shift = np.zeros(num_workers, dtype=bool)
+        self.last_shift = np.zeros(num_workers, dtype=np.int64)
+        self.shift_days = np.zeros((num_workers, horizon.num_days), dtype=np.int16)
+        self.weekend_counts = np.zeros(num_workers, dtype=np.int32)
+        self.weekly_counts = np.zeros((num_workers, horizon.num_weeks), dtype=np.int32)
+        self.job_counts = np.zeros((num_workers, len(self.job_index)), dtype=np.int32)
+        self.last_job = np.full(num_workers, self.NO_JOB, dtype=np.int32)
+        self.last_weekday = np.full(num_workers, -1, dtype=np.int8)
+        self.rotation = np.zeros((num_workers, 7), dtype=bool)
+
+    def add_row(self, worker):
+        """Grow the arrays by one empty row for a worker joining the roster; returns the row."""
+        row = len(self.shift_quota)
+        self.rows[worker.identification] = row
+        for name, fill in (('shift_quota', worker.shift_quota), ('percentage_shifts', worker.percentage_shifts), ('has_last_shift', False),
+                           ('last_shift', 0), ('shift_days', 0), ('weekend_counts', 0), ('weekly_counts', 0), ('job_counts', 0),
+                           ('last_job', self.NO_JOB), ('last_weekday', -1), ('rotation', False)):
+            array = getattr(self, name)
+            setattr(self, name, np.concatenate([array, np.full((1,) + array.shape[1:], fill, dtype=array.dtype)]))
+        return row
+
+    def set_last_shift(self, row, offset):
+        self.has_last_shift[row] = True
+        self.last_shift[row] = offset
+
+    def latest_shift(self, row):
+        """Offset of the worker's latest shift in the horizon, or None."""
+        days = np.flatnonzero(self.shift_days[row])
+        return int(days[-1]) if days.size else None
+
+    def record(self, row, offset, job_row):
+        self.set_last_shift(row, offset)
+        self.shift_days[row, offset] += 1
+        self.job_counts[row, job_row] += 1
+        self.weekly_counts[row, self.horizon.week_indices[offset]] += 1
+        if self.horizon.weekend_or_holiday[offset]:
+            self.weekend_counts[row] += 1
+        self.shift_quota[row] -= 1
+
+    def unrecord(self, row, offset, job_row):
+        self.shift_days[row, offset] -= 1
+        latest = self.latest_shift(row)
+        self.has_last_shift[row] = latest is not None
+        if latest is not None:
+            self.last_shift[row] = latest
+        self.job_counts[row, job_row] -= 1
+        self.weekly_counts[row, self.horizon.week_indices[offset]] -= 1
+        if self.horizon.weekend_or_holiday[offset]:
+            self.weekend_counts[row] -= 1
+        self.shift_quota[row] += 1
+
+    def rotate(self, row, job_row, weekday):
+        """Note the job and weekday of the worker's newest shift for the rotation tie-breaks."""
+        self.last_job[row] = job_row
+        self.last_weekday[row] = weekday
+        self.rotation[row, weekday] = True
+
+class CandidateQueue:
+    """Priority queue of roster rows in the scheduler's ranking order.
+
+    Workers are ranked by longest time since their last shift, then most
+    remaining quota, then highest percentage_shifts. Those only change when
+    a worker is assigned, so each assignment pushes one fresh entry and the
+    superseded one is dropped lazily when it reaches the top. Ties are
+    settled by job and weekday rotation, then by roster order, exactly as
+    the former max() over the candidate list did.
+    """
+    def __init__(self, workers, roster_arrays):
+        self.workers = workers
+        self.roster_arrays = roster_arrays
+        self.versions = [0] * len(workers)
+        self.heap = [self._entry(row) for row in range(len(workers))]
+        heapq.heapify(self.heap)
+
+    def _entry(self, row):
+        arrays = self.roster_arrays
+        last_shift = int(arrays.last_shift[row]) if arrays.has_last_shift[row] else float('-inf')
+        return (last_shift, -float(arrays.shift_quota[row]), -float(arrays.percentage_shifts[row]), row, self.versions[row])
+
+    def update(self, row):
+        self.versions[row] += 1
+        heapq.heappush(self.heap, self._entry(row))
+
+    def select(self, mask, job_row, weekday):
+        """Return the best row allowed by mask for this job row and weekday, or None."""
+        popped = []
+        tied = []
+        best_rank = None
+        while self.heap:
+            entry = heapq.heappop(self.heap)
+            rank, row, version = entry[:3], entry[3], entry[4]
+            if version != self.versions[row]:
+                continue
+            popped.append(entry)
+            if best_rank is not None and rank != best_rank:
+                break
+            if mask[row]:
+                best_rank = rank
+                tied.append(row)
+        for entry in popped:
+            heapq.heappush(self.heap, entry)
+        if not tied:
+            return None
+        if len(tied) == 1:
+            return tied[0]
+
+        arrays = self.roster_arrays
+        def rotation(row):
+            return (arrays.last_job[row] != job_row, arrays.last_weekday[row] != weekday, not arrays.rotation[row, weekday])
+        # max() keeps the first of equal keys, and tied rows come out of the heap in roster order
+        return max(tied, key=rotation)
+
+def _rejected(reason, worker, date):
+    if instrumentation.enabled:
+        instrumentation.reject(reason)
+        instrumentation.trace("Worker %s cannot work on %s: %s", worker.identification, date, reason)
+    return False
+
+def can_work_on_date(worker, date, job, roster_arrays, availability, group_occupancy, min_distance, max_shifts_per_week, override=False):
+    """Check one worker for one slot of the run's horizon against its trackers.
+
+    With override only availability and job compatibility are checked, as
+    for obligatory coverage.
+    """
     if isinstance(date, str) and date:  # Check if date is a non-empty string
-        date = datetime.strptime(date.strip(), "%d/%m/%Y")  # Ensure date is a datetime object
+        date = parse_date(date)
 
     # Check for group incompatibility
-    if schedule and workers and not override:
-        for job_schedule in schedule.values():
-            if date.strftime("%d/%m/%Y") in job_schedule:
-                assigned_worker_id = job_schedule[date.strftime("%d/%m/%Y")]
-                assigned_worker = next((w for w in workers if w.identification == assigned_worker_id), None)
-                if assigned_worker:
-                    logging.debug(f"Assigned worker {assigned_worker.identification} found for job on {date}")
-                    if any(group == assigned_worker.group for group in worker.group_incompatibility):
-                        logging.debug(f"Worker {worker.identification} cannot work on {date} due to group incompatibility with worker {assigned_worker.identification}.")
-                        return False
-
-    if date in [datetime.strptime(day.strip(), "%d/%m/%Y") for day in worker.unavailable_dates if day]:
-        logging.debug(f"Worker {worker.identification} cannot work on {date} due to unavailability.")
-        return False
+    if not override and group_occupancy.conflicts(worker, date):
+        return _rejected('group_incompatibility', worker, date)
 
-    # Check if the date is within the worker's working dates range
-    if not override:
-        for start_date, end_date in worker.work_dates:
-            if start_date <= date <= end_date:
-                break
-        else:
-            logging.debug(f"Worker {worker.identification} cannot work on {date} because it is outside their working dates.")
-            return False
+    if availability.is_unavailable(worker, date):
+        return _rejected('unavailable', worker, date)
+
+    if worker.is_incompatible_with(job):
+        return _rejected('incompatible_job', worker, date)
 
-    if not override:
+    if override:
+        return True
+
+    # Check if the date is within the worker's working dates range
+    if not availability.is_in_work_period(worker, date):
+        return _rejected('outside_work_dates', worker, date)
+
+    row = roster_arrays.rows[worker.identification]
+    calendar = roster_arrays.horizon
+    offset = calendar.offset(date)
+    days_diff = offset - int(roster_arrays.last_shift[row]) if roster_arrays.has_last_shift[row] else None
+    if days_diff is not None:
         # Adjust the minimum distance for workers performing less than 100% of shifts
-        adjusted_min_distance = min_distance * 100 / worker.percentage_shifts
-
-        # Check across all workstations for the current worker
-        if last_shift_dates[worker.identification]:
-            last_date = last_shift_dates[worker.identification][-1]
-            days_diff = (date - last_date).days
-            logging.debug(f"Worker {worker.identification} last worked on {last_date}, {days_diff} days ago.")
-            if days_diff < adjusted_min_distance:
-                logging.debug(f"Worker {worker.identification} cannot work on {date} due to adjusted minimum distance.")
-                return False
-            if days_diff in {7, 14, 21, 28}:
-                logging.debug(f"Worker {worker.identification} cannot work on {date} due to 7, 14, 21 or 28 days constraint.")
-                return False
-            if last_date.date() == date.date():
-                logging.debug(f"Worker {worker.identification} cannot work on {date} because they already have a shift on this day.")
-
-        if is_weekend(date) or is_holiday(date.strftime("%d/%m/%Y"), holidays_set):
-            if weekend_tracker[worker.identification] >= 4:
-                logging.debug(f"Worker {worker.identification} cannot work on {date} due to weekend/holiday limit.")
-                return False
-
-        week_number = date.isocalendar()[1]
-        if weekly_tracker[worker.identification][week_number] >= max_shifts_per_week:
-            logging.debug(f"Worker {worker.identification} cannot work on {date} due to weekly quota limit.")
-            return False
+        if days_diff < min_distance * 100 / worker.percentage_shifts:
+            return _rejected('min_distance', worker, date)
+        if days_diff in {7, 14, 21, 28}:
+            return _rejected('weekday_cycle', worker, date)
 
-        if job in job_count[worker.identification] and job_count[worker.identification][job] > 0 and (date - last_shift_dates[worker.identification][-1]).days == 1:
-            logging.debug(f"Worker {worker.identification} cannot work on {date} due to job repetition limit.")
-            return False
+    if calendar.weekend_or_holiday[offset] and roster_arrays.weekend_counts[row] >= 4:
+        return _rejected('weekend_limit', worker, date)
+
+    if roster_arrays.weekly_counts[row, calendar.week_indices[offset]] >= max_shifts_per_week:
+        return _rejected('weekly_limit', worker, date)
+
+    if roster_arrays.job_counts[row, roster_arrays.job_index[job]] > 0 and days_diff == 1:
+        return _rejected('job_repetition', worker, date)
 
     return True
 
-def assign_worker_to_shift(worker, date, job, schedule, last_shift_dates, weekend_tracker, weekly_tracker, job_count, holidays_set, min_distance, max_shifts_per_week, obligatory=False):
-    logging.debug(f"Assigning worker {worker.identification} to job {job} on {date.strftime('%d/%m/%Y')}")
-    last_shift_dates[worker.identification].append(date)
-    schedule[job][date.strftime("%d/%m/%Y")] = worker.identification
-    job_count[worker.identification][job] += 1
-    weekly_tracker[worker.identification][date.isocalendar()[1]] += 1
-    if is_weekend(date) or is_holiday(date.strftime("%d/%m/%Y"), holidays_set):
-        weekend_tracker[worker.identification] += 1
+def assign_worker_to_shift(worker, date, job, schedule, roster_arrays, obligatory=False, group_occupancy=None):
+    schedule.assign(job, date, worker.identification)
+    if group_occupancy is not None:
+        group_occupancy.add(worker, date)
+    # The schedule grid's horizon covers every date that can be assigned
+    calendar = schedule.horizon
+    offset = calendar.offset(date)
+    roster_arrays.record(roster_arrays.rows[worker.identification], offset, roster_arrays.job_index[job])
     worker.shift_quota -= 1
     if obligatory:
         worker.obligatory_coverage_shifts[date] = job  # Mark obligatory coverage shift
-    logging.debug(f"Worker {worker.identification} assigned to job {job} on {date.strftime('%d/%m/%Y')}. Updated schedule: {schedule[job][date.strftime('%d/%m/%Y')]}")
-
-def schedule_shifts(work_periods, holidays, jobs, workers, min_distance, max_shifts_per_week):
-    logging.basicConfig(level=logging.DEBUG)
-
-    schedule = defaultdict(dict)
-    holidays_set = set(holidays)
-    weekend_tracker = {worker.identification: 0 for worker in workers}
-    last_shift_dates = {worker.identification: [date for date, _ in worker.previously_assigned_shifts] for worker in workers}
-    job_count = {worker.identification: {job: 0 for job in jobs} for worker in workers}
-    weekly_tracker = defaultdict(lambda: defaultdict(int))
-    last_assigned_job = {worker.identification: None for worker in workers}
-    last_assigned_day = {worker.identification: None for worker in workers}
-    day_rotation_tracker = {worker.identification: {i: False for i in range(7)} for worker in workers}
-
-    # Integrate previously assigned shifts into the current schedule
-    for worker in workers:
-        for date, job in worker.previously_assigned_shifts:
-            if job in jobs:
-                assign_worker_to_shift(worker, date, job, schedule, last_shift_dates, weekend_tracker, weekly_tracker, job_count, holidays_set, min_distance, max_shifts_per_week, obligatory=False)
-
+    if instrumentation.tracing:
+        instrumentation.trace("Worker %s assigned to job %s on %s", worker.identification, job, calendar.date_strs[offset])
+
+def unassign_worker_from_shift(worker, date, job, schedule, roster_arrays, group_occupancy=None):
+    """Undo assign_worker_to_shift for one shift, releasing the slot and every tracker it touched."""
+    schedule.unassign(job, date)
+    if group_occupancy is not None:
+        group_occupancy.remove(worker, date)
+    calendar = schedule.horizon
+    offset = calendar.offset(date)
+    roster_arrays.unrecord(roster_arrays.rows[worker.identification], offset, roster_arrays.job_index[job])
+    worker.shift_quota += 1
+    if worker.obligatory_coverage_shifts.get(date) == job:
+        del worker.obligatory_coverage_shifts[date]
+    if instrumentation.tracing:
+        instrumentation.trace("Worker %s removed from job %s on %s", worker.identification, job, calendar.date_strs[offset])
+
+class SchedulingState:
+    """Everything a schedule_shifts run keeps between assignments.
+
+    It is attached to the returned schedule as schedule.state so later edits
+    (see schedule_repair) can continue from the same trackers instead of
+    rescheduling the whole horizon.
+    """
+    def __init__(self, workers, jobs, holidays_set, min_distance, max_shifts_per_week, work_periods, horizon, grid,
+                 availability, group_occupancy, roster_arrays, total_slots):
+        self.workers = workers
+        self.jobs = jobs
+        self.holidays_set = holidays_set
+        self.min_distance = min_distance
+        self.max_shifts_per_week = max_shifts_per_week
+        self.work_periods = work_periods
+        self.horizon = horizon
+        self.grid = grid
+        self.availability = availability
+        self.group_occupancy = group_occupancy
+        self.roster_arrays = roster_arrays
+        self.total_slots = total_slots
+        # Quota each worker started the run with, by roster row; the assigned count is initial_quota - shift_quota
+        self.initial_quota = roster_arrays.shift_quota.copy()
+        self.removed = set()
+
+    def assign(self, worker, date, job, obligatory=False):
+        assign_worker_to_shift(worker, date, job, self.grid, self.roster_arrays, obligatory=obligatory, group_occupancy=self.group_occupancy)
+
+    def unassign(self, worker, date, job):
+        unassign_worker_from_shift(worker, date, job, self.grid, self.roster_arrays, group_occupancy=self.group_occupancy)
+
+    def place(self, occupied, row, offset, job_row, obligatory=False):
+        """Assign a shift by roster row, day offset and job row, keeping the occupied workers x days array in step."""
+        self.assign(self.workers[row], self.horizon.dates[offset], self.jobs[job_row], obligatory=obligatory)
+        occupied[row, offset] = True
+        # Shifts can now land before the worker's latest one, which stays the last shift
+        self.roster_arrays.last_shift[row] = self.roster_arrays.latest_shift(row)
+
+    def release(self, occupied, row, offset, job_row):
+        self.unassign(self.workers[row], self.horizon.dates[offset], self.jobs[job_row])
+        # A worker booked twice that day by the override fallback still has the other shift
+        occupied[row, offset] = self.roster_arrays.shift_days[row, offset] > 0
+
+    def period_mask(self):
+        """Boolean array over the horizon: True on days inside the run's work periods."""
+        in_periods = np.zeros(self.horizon.num_days, dtype=bool)
+        for start_date, end_date in self.work_periods:
+            in_periods[max(self.horizon.offset(start_date), 0):self.horizon.offset(end_date) + 1] = True
+        return in_periods
+
+    def occupancy(self):
+        """Workers x days boolean array: True where the worker has a shift that day."""
+        occupied = np.zeros((len(self.workers), self.horizon.num_days), dtype=bool)
+        job_rows, offsets = np.nonzero(self.grid.assignments != ScheduleGrid.EMPTY)
+        occupied[self.grid.assignments[job_rows, offsets], offsets] = True
+        return occupied
+
+    def shifts_of(self, row):
+        """(offset, job row) of each of the worker's shifts, in date order."""
+        job_rows, offsets = np.nonzero(self.grid.assignments == row)
+        return sorted(zip(offsets.tolist(), job_rows.tolist()))
+
+    def rebind(self, workers):
+        """Move the state onto other objects for the same workers, taking their order as the roster order.
+
+        Grid rows, trackers and compiled constraints are reordered to match, so
+        a schedule run on copies can be handed back as if run on the originals.
+        """
+        order = np.array([self.grid.worker_index[worker.identification] for worker in workers], dtype=np.int64)
+        new_rows = np.empty_like(order)
+        new_rows[order] = np.arange(len(order))
+        filled = self.grid.assignments != ScheduleGrid.EMPTY
+        self.grid.assignments[filled] = new_rows[self.grid.assignments[filled]]
+        self.grid.worker_ids = [worker.identification for worker in workers]
+        self.grid.worker_index = {worker_id: row for row, worker_id in enumerate(self.grid.worker_ids)}
+
+        arrays = self.roster_arrays
+        for name in ('shift_quota', 'percentage_shifts', 'has_last_shift', 'last_shift', 'shift_days', 'weekend_counts',
+                     'weekly_counts', 'job_counts', 'last_job', 'last_weekday', 'rotation'):
+            setattr(arrays, name, getattr(arrays, name)[order])
+        arrays.rows = dict(self.grid.worker_index)
+        availability = self.availability
+        for name in ('in_work_period', 'unavailable', 'obligatory'):
+            setattr(availability, name, getattr(availability, name)[order])
+        availability.rows = dict(self.grid.worker_index)
+        # Group columns are numbered in roster order too
+        self.group_occupancy = GroupOccupancy.from_grid(self.grid, workers)
+        self.initial_quota = self.initial_quota[order]
+        self.workers = list(workers)
+        self.constraints.compile(self)
+
+    def changes(self, before):
+        """(job, date_str, previous worker id, new worker id) for every slot that differs from the before assignments."""
+        grid = self.grid
+        changes = []
+        for job_row, offset in zip(*np.nonzero(grid.assignments != before)):
+            previous, current = before[job_row, offset], grid.assignments[job_row, offset]
+            changes.append((
+                grid.jobs[job_row], self.horizon.date_strs[offset],
+                None if previous == ScheduleGrid.EMPTY else grid.worker_ids[previous],
+                None if current == ScheduleGrid.EMPTY else grid.worker_ids[current]
+            ))
+        return changes
+
+    def holds_obligatory(self, job_row, offset):
+        """Whether the slot is its worker's obligatory shift, which obligatory coverage of others must not displace."""
+        holder = self.grid.assignments[job_row, offset]
+        return holder != ScheduleGrid.EMPTY and self.workers[holder].obligatory_coverage_shifts.get(self.horizon.dates[offset]) == self.jobs[job_row]
+
+def _restore_carry(roster_arrays, row, carried, last_shift):
+    """Seed one worker's trackers with the state an earlier run carried over (see schedule_shifts)."""
+    horizon = roster_arrays.horizon
+    if last_shift is not None:
+        roster_arrays.set_last_shift(row, horizon.offset(last_shift))
+    roster_arrays.weekend_counts[row] = carried.get('weekend_count', 0)
+    for job, count in carried.get('job_counts', {}).items():
+        if job in roster_arrays.job_index:
+            roster_arrays.job_counts[row, roster_arrays.job_index[job]] = count
+    for week, count in carried.get('week_counts', {}).items():
+        year, number = week.split('-W')
+        week_index = horizon.week_index_of.get((int(year), int(number)))
+        if week_index is not None:
+            roster_arrays.weekly_counts[row, week_index] = count
+    last_job = carried.get('last_job')
+    if last_job in roster_arrays.job_index:
+        roster_arrays.last_job[row] = roster_arrays.job_index[last_job]
+    if carried.get('last_weekday') is not None:
+        roster_arrays.last_weekday[row] = carried['last_weekday']
+    roster_arrays.rotation[row] = carried.get('rotation') or False
+
+class SchedulingCancelled(Exception):
+    """Raised by schedule_shifts when its cancelled() callback returns True."""
+
+def parse_work_periods(work_periods):
     valid_work_periods = []
     for period in work_periods:
         try:
@@ -167,65 +784,159 @@ def schedule_shifts(work_periods, holidays, jobs, workers, min_distance, max_shi
             valid_work_periods.append((start_date, end_date))
         except ValueError as e:
             logging.error(f"Invalid period '{period}': {e}")
+    return valid_work_periods
+
+def schedule_shifts(work_periods, holidays, jobs, workers, min_distance, max_shifts_per_week, seed_assignments=None, progress=None, cancelled=None, constraints=None, carry=None):
+    """Distribute shifts over the work periods and return a ScheduleView.
+
+    seed_assignments is an optional iterable of (date, job, worker_id)
+    applied after obligatory coverage and kept as they are, e.g. the part
+    of an earlier run that is still valid (see schedule_cache). Seeds for
+    filled slots, unknown jobs or workers, or dates outside the horizon
+    are ignored.
+
+    progress(days_done, total_days) is called after each scheduled day and
+    cancelled() is polled before it; once it returns True the run stops
+    with SchedulingCancelled, e.g. to stop it from another thread.
+
+    constraints is an optional list of extra constraints.Constraint objects
+    that the main loop checks along with the built-in rules.
+
+    carry maps worker ids to the state an earlier run left them in, as
+    made by rolling_horizon.carried_state: their last shift, per-job and
+    weekend counts, shifts in the current week, job and weekday rotation
+    and the quota still owed. It continues a roster without replaying its
+    history (see rolling_horizon).
+    """
+    with instrumentation.phase('setup'):
+        valid_work_periods = parse_work_periods(work_periods)
+        for worker in workers:
+            # Obligatory shifts belong to one run; workers scheduled again start without them
+            worker.obligatory_coverage_shifts = {}
+        carry = {worker.identification: carry[worker.identification] for worker in workers if worker.identification in carry} if carry else {}
+        # Only the last carried shift is read, so the horizon reaches back to it and no further
+        carried_last_shifts = {worker_id: parse_date(carried['last_shift']) for worker_id, carried in carry.items() if carried.get('last_shift')}
+
+        # Assignments live in a jobs x days array of worker indices; callers get a read-only dict-like view
+        horizon = build_horizon(valid_work_periods, workers, jobs, holidays, carried_last_shifts.values())
+        grid = ScheduleGrid(jobs, workers, horizon)
+        schedule = ScheduleView(grid)
+        group_occupancy = GroupOccupancy(workers, horizon)
+        holidays_set = set(holidays)
+        # Every per-worker tracker lives in typed arrays indexed by roster row and job
+        roster_arrays = RosterArrays(workers, jobs, horizon)
+        for worker_id, carried in carry.items():
+            _restore_carry(roster_arrays, roster_arrays.rows[worker_id], carried, carried_last_shifts.get(worker_id))
+        for row, worker in enumerate(workers):
+            if worker.previously_assigned_shifts:
+                # Shifts on jobs outside this run still count towards the distance to the next one
+                roster_arrays.set_last_shift(row, horizon.offset(worker.previously_assigned_shifts[-1][0]))
 
-    total_days = sum((end_date - start_date).days + 1 for start_date, end_date in valid_work_periods)
-    jobs_per_day = len(jobs)
-    calculate_shift_quota(workers, total_days, jobs_per_day)
-
-    for worker in workers:
-        if not worker.work_dates:
-            worker.work_dates = valid_work_periods
-
-        for date_str in worker.obligatory_coverage:
-            if date_str.strip():
-                date = datetime.strptime(date_str.strip(), "%d/%m/%Y")
-                for job in jobs:
-                    if can_work_on_date(worker, date, last_shift_dates, weekend_tracker, holidays_set, weekly_tracker, job, job_count, min_distance, max_shifts_per_week, override=True, schedule=schedule, workers=workers):
-                        assign_worker_to_shift(worker, date, job, schedule, last_shift_dates, weekend_tracker, weekly_tracker, job_count, holidays_set, min_distance, max_shifts_per_week, obligatory=True)
-                        last_assigned_job[worker.identification] = job
-                        last_assigned_day[worker.identification] = date.weekday()
-                        day_rotation_tracker[worker.identification][date.weekday()] = True
-                        break
-
-    for start_date, end_date in valid_work_periods:
-        for date in generate_date_range(start_date, end_date):
-            date_str = date.strftime("%d/%m/%Y")
-            for job in jobs:
-                if any(worker.obligatory_coverage_shifts.get(date) == job for worker in workers):
+    # Integrate previously assigned shifts into the current schedule
+    with instrumentation.phase('previous_shifts'):
+        for worker in workers:
+            for date, job in worker.previously_assigned_shifts:
+                if job in jobs:
+                    assign_worker_to_shift(worker, date, job, grid, roster_arrays, obligatory=False, group_occupancy=group_occupancy)
+                    if instrumentation.enabled:
+                        instrumentation.count('previous_shifts', 'integrated')
+
+    with instrumentation.phase('quota'):
+        total_days = sum((end_date - start_date).days + 1 for start_date, end_date in valid_work_periods)
+        jobs_per_day = len(jobs)
+        calculate_shift_quota(workers, total_days, jobs_per_day)
+        for worker in workers:
+            if worker.identification in carry:
+                # Shifts still owed (or given in excess) by the earlier run
+                worker.shift_quota += carry[worker.identification].get('quota_balance', 0)
+        roster_arrays.shift_quota[:] = [worker.shift_quota for worker in workers]
+
+    with instrumentation.phase('compile'):
+        for worker in workers:
+            if not worker.work_dates:
+                worker.work_dates = valid_work_periods
+
+        # Compile work periods, unavailable and obligatory dates into day-indexed arrays once
+        availability = compile_availability(workers, horizon)
+        schedule.state = SchedulingState(workers, jobs, holidays_set, min_distance, max_shifts_per_week, valid_work_periods, horizon, grid,
+                                         availability, group_occupancy, roster_arrays, total_days * jobs_per_day)
+        # Rules are compiled once per run; the engine works out which order rejects workers cheapest
+        constraint_engine = schedule.state.constraints = ConstraintEngine(default_constraints() + list(constraints or []))
+        constraint_engine.compile(schedule.state)
+
+    with instrumentation.phase('obligatory'):
+        for row, worker in enumerate(workers):
+            seen = set()
+            for date_str in worker.obligatory_coverage:
+                if date_str.strip():
+                    date = datetime.strptime(date_str.strip(), "%d/%m/%Y")
+                    if date in seen:
+                        continue  # Listed twice
+                    seen.add(date)
+                    offset = horizon.offset(date)
+                    for job_row, job in enumerate(jobs):
+                        if can_work_on_date(worker, date, job, roster_arrays, availability, group_occupancy, min_distance, max_shifts_per_week, override=True) and not schedule.state.holds_obligatory(job_row, offset):
+                            # Obligatory coverage takes a slot over from a previously assigned shift
+                            holder = grid.assignments[job_row, offset]
+                            if holder != ScheduleGrid.EMPTY:
+                                schedule.state.unassign(workers[holder], date, job)
+                            assign_worker_to_shift(worker, date, job, grid, roster_arrays, obligatory=True, group_occupancy=group_occupancy)
+                            roster_arrays.rotate(row, job_row, horizon.weekdays[horizon.offset(date)])
+                            if instrumentation.enabled:
+                                instrumentation.count('obligatory', 'assigned')
+                            break
+
+    if seed_assignments:
+        with instrumentation.phase('seed'):
+            for date, job, worker_id in sorted(seed_assignments, key=lambda seed: seed[0]):
+                row = grid.worker_index.get(worker_id)
+                if row is None or job not in grid.job_index or date not in horizon or grid.is_filled(job, date):
                     continue
-
-                assigned = False
-                iteration_count = 0
-                max_iterations = len(workers) * 2
-
-                while not assigned and iteration_count < max_iterations:
-                    available_workers = [worker for worker in workers if worker.shift_quota > 0 and can_work_on_date(worker, date_str, last_shift_dates, weekend_tracker, holidays_set, weekly_tracker, job, job_count, min_distance, max_shifts_per_week)]
-                    if not available_workers:
-                        available_workers = [worker for worker in workers if worker.shift_quota > 0 and can_work_on_date(worker, date_str, last_shift_dates, weekend_tracker, holidays_set, weekly_tracker, job, job_count, min_distance, max_shifts_per_week, override=True)]
-                        if not available_workers:
+                assign_worker_to_shift(workers[row], date, job, grid, roster_arrays, group_occupancy=group_occupancy)
+                roster_arrays.rotate(row, grid.job_index[job], horizon.weekdays[horizon.offset(date)])
+                if instrumentation.enabled:
+                    instrumentation.count('seed', 'assigned')
+
+    with instrumentation.phase('main_loop'):
+        candidate_queue = CandidateQueue(workers, roster_arrays)
+        days_done = 0
+        for start_date, end_date in valid_work_periods:
+            for offset in range(horizon.offset(start_date), horizon.offset(end_date) + 1):
+                if cancelled is not None and cancelled():
+                    raise SchedulingCancelled(f"Scheduling cancelled after {days_done} of {total_days} days")
+                date, date_str, weekday = horizon.dates[offset], horizon.date_strs[offset], horizon.weekdays[offset]
+                for job_row, job in enumerate(jobs):
+                    # Slots already taken by obligatory coverage or previously assigned shifts are kept
+                    if grid.assignments[job_row, offset] != ScheduleGrid.EMPTY:
+                        if instrumentation.enabled:
+                            instrumentation.count('main_loop', 'already_filled')
+                        continue
+
+                    # Strict and override feasibility of the whole roster come out of one pass
+                    strict, override = constraint_engine.masks(schedule.state, offset, job_row)
+                    row = candidate_queue.select(strict, job_row, weekday) if strict.any() else None
+                    if row is None:
+                        row = candidate_queue.select(override, job_row, weekday) if override.any() else None
+                        if row is None:
                             logging.error(f"No available workers for job {job} on {date_str}. Stopping assignment.")
+                            if instrumentation.enabled:
+                                instrumentation.count('main_loop', 'unfilled')
                             return schedule
+                        if instrumentation.enabled:
+                            instrumentation.count('main_loop', 'override_assigned')
+                    elif instrumentation.enabled:
+                        instrumentation.count('main_loop', 'assigned')
 
-                    worker = max(available_workers, key=lambda w: (
-                        (date - last_shift_dates[w.identification][-1]).days if last_shift_dates[w.identification] else float('inf'),
-                        w.shift_quota,
-                        w.percentage_shifts,
-                        last_assigned_job[w.identification] != job,
-                        last_assigned_day[w.identification] != date.weekday(),
-                        not day_rotation_tracker[w.identification][date.weekday()]
-                    ))
-                    assign_worker_to_shift(worker, date, job, schedule, last_shift_dates, weekend_tracker, weekly_tracker, job_count, holidays_set, min_distance, max_shifts_per_week)
-                    last_assigned_job[worker.identification] = job
-                    last_assigned_day[worker.identification] = date.weekday()
-                    day_rotation_tracker[worker.identification][date.weekday()] = True
-                    assigned = True
-
-                    iteration_count += 1
-                    if iteration_count >= max_iterations:
-                        logging.error(f"Exceeded maximum iterations for job {job} on {date_str}. Exiting to prevent infinite loop.")
-                        return schedule
-
-    logging.debug(f"Final schedule: {schedule}")
+                    assign_worker_to_shift(workers[row], date, job, grid, roster_arrays, group_occupancy=group_occupancy)
+                    candidate_queue.update(row)
+                    roster_arrays.rotate(row, job_row, weekday)
+
+                days_done += 1
+                if progress is not None:
+                    progress(days_done, total_days)
+
+    if instrumentation.tracing:
+        instrumentation.trace("Final schedule: %s", schedule)
     return schedule
     
 def prepare_breakdown(schedule):
@@ -236,22 +947,56 @@ def prepare_breakdown(schedule):
     return breakdown
 
 def export_breakdown(breakdown):
-    output = ""
+    # Collected and joined once; growing one string per shift is quadratic on large schedules
+    lines = []
     for worker_id, shifts in breakdown.items():
-        output += f"Worker {worker_id}:\n"
-        for date, job in shifts:
-            output += f"  {date}: {job}\n"
-    return output
+        lines.append(f"Worker {worker_id}:\n")
+        lines.extend(f"  {date}: {job}\n" for date, job in shifts)
+    return ''.join(lines)
     
-def export_schedule_to_csv(schedule, filename='shift_schedule.csv'):
-    with open(filename, mode='w', newline='') as file:
+def iter_shift_rows(schedule, workers=None, holidays=()):
+    """Yield one (date, job, worker, group, weekend/holiday) row per assigned shift.
+
+    Schedules returned by schedule_shifts are walked day by day straight
+    from their grid; plain dict schedules are walked job by job. Groups
+    come from workers, or from the scheduling state when omitted.
+    """
+    state = getattr(schedule, 'state', None)
+    if workers is None and state is not None:
+        workers = state.workers
+    groups = {worker.identification: worker.group for worker in workers or ()}
+    grid = getattr(schedule, 'grid', None)
+    if grid is not None:
+        horizon = grid.horizon
+        # Transposed so the shifts come out in date order, jobs in grid order within a day
+        offsets, job_rows = np.nonzero(grid.assignments.T != ScheduleGrid.EMPTY)
+        worker_rows = grid.assignments[job_rows, offsets]
+        for offset, job_row, worker_row in zip(offsets.tolist(), job_rows.tolist(), worker_rows.tolist()):
+            worker_id = grid.worker_ids[worker_row]
+            yield (horizon.date_strs[offset], grid.jobs[job_row], worker_id, groups.get(worker_id, ''), int(horizon.weekend_or_holiday[offset]))
+        return
+    holidays_set = {holiday.strip() for holiday in holidays}
+    for job, shifts in schedule.items():
+        for date_str, worker_id in shifts.items():
+            weekend_or_holiday = is_weekend(parse_date(date_str)) or is_holiday(date_str, holidays_set)
+            yield (date_str, job, worker_id, groups.get(worker_id, ''), int(weekend_or_holiday))
+
+@instrumentation.timed('export_csv')
+def export_schedule_to_csv(schedule, filename='shift_schedule.csv', workers=None, holidays=(), batch_size=4096):
+    """Stream the schedule to a per-shift CSV, gzip-compressed if filename ends in .gz.
+
+    The file can be loaded back with import_workers_from_csv.
+    """
+    rows = iter_shift_rows(schedule, workers, holidays)
+    with _open_csv(filename, 'w') as file:
         writer = csv.writer(file)
-        # Correct headers
-        writer.writerow(['Identification', 'Work Dates', 'Percentage', 'Group', 'Incompatible Job', 'Group Incompatibility', 'Obligatory Coverage', 'Unavailable Dates'])
-        for job, shifts in schedule.items():
-            for date, worker in shifts.items():
-                writer.writerow([worker, '', '', '', '', '', '', ''])  # Adjust the values based on your data structure
-                
+        writer.writerow(SHIFT_EXPORT_HEADERS)
+        while True:
+            batch = list(islice(rows, batch_size))
+            if not batch:
+                break
+            writer.writerows(batch)
+
 if __name__ == "__main__":
     # User input for the required parameters
     work_periods = input("Enter work periods (e.g., 01/10/2024-31/10/2024, separated by commas): ").split(',')
@@ -0,0 +1,117 @@
+import logging
+from datetime import datetime, timedelta
+
+import numpy as np
+
+from benchmarks.roster_generator import RosterSpec, generate_roster
+from constraints import Constraint, WeekdayCycle
+from local_search import improve_schedule
+from schedule_repair import repair_remove_worker
+from shift_scheduler import Worker, can_work_on_date, schedule_shifts
+
+logging.disable(logging.CRITICAL)
+
+def test_history_on_other_job_outside_horizon():
+    # The history shift is on a job outside the run, so the horizon does not reach back to it
+    workers = [Worker('W1', previously_assigned_shifts=[(datetime(2023, 1, 1), 'Z')]), Worker('W2')]
+    schedule = schedule_shifts(['01/01/2025-31/01/2025'], [], ['A'], workers, 2, 3)
+    assert len(schedule['A']) == 31
+
+def test_weekday_cycle_with_last_shift_outside_horizon():
+    workers = [Worker('W1', previously_assigned_shifts=[(datetime(2023, 1, 1), 'Z')]),
+               Worker('W2', previously_assigned_shifts=[(datetime(2026, 1, 1), 'Z')]),
+               Worker('W3', previously_assigned_shifts=[(datetime(2024, 12, 25), 'Z')])]
+    state = schedule_shifts(['01/01/2025-03/01/2025'], [], ['A'], workers, 1, 7).state
+    state.roster_arrays.last_shift[:] = [state.horizon.offset(datetime(2023, 1, 1)), state.horizon.offset(datetime(2026, 1, 1)),
+                                         state.horizon.offset(datetime(2024, 12, 25))]
+    state.roster_arrays.has_last_shift[:] = True
+    rejected = WeekdayCycle().rejects(state, slice(None), state.horizon.offset(datetime(2025, 1, 1)), 0)
+    assert rejected.tolist() == [False, False, True]
+    assert np.array_equal(WeekdayCycle().rejects(state, np.array([2, 0]), state.horizon.offset(datetime(2025, 1, 1)), 0), [True, False])
+
+class NoJobB(Constraint):
+    name = 'no_job_b'
+    hard = True
+
+    def __init__(self, worker_id):
+        self.worker_id = worker_id
+
+    def compile(self, state):
+        self.row = state.grid.worker_index[self.worker_id]
+
+    def rejects(self, state, rows, offset, job_row):
+        if state.jobs[job_row] != 'B':
+            return None
+        return np.arange(len(state.workers))[rows] == self.row
+
+def test_custom_constraint_binds_repairs_and_local_search():
+    workers = [Worker(f"W{n}") for n in range(1, 9)]
+    schedule = schedule_shifts(['01/02/2025-31/03/2025'], [], ['A', 'B'], workers, 2, 3, constraints=[NoJobB('W2')])
+    assert 'W2' not in schedule['B'].values()
+    repair_remove_worker(schedule, 'W1')
+    improve_schedule(schedule, time_budget=0.5)
+    assert 'W2' not in schedule['B'].values()
+    assert 'W2' in schedule['A'].values()
+
+class StateProbe(Constraint):
+    """Rules out nobody; keeps the run's state so a test can look at it between days."""
+    name = 'state_probe'
+
+    def compile(self, state):
+        self.state = state
+
+    def rejects(self, state, rows, offset, job_row):
+        return None
+
+def test_engine_masks_match_can_work_on_date():
+    checked = []
+    for seed in range(4):
+        roster = generate_roster(RosterSpec(workers=30, jobs=3, days=70, history_shifts=3, incompatible_share=0.3,
+                                            partial_availability_share=0.3, obligatory_per_worker=seed % 2, seed=seed))
+        work_periods, holidays, jobs, workers, min_distance, max_shifts_per_week = roster.schedule_args()
+        for n, worker in enumerate(workers):
+            if n % 3 == 0:
+                # History on a job outside the run counts towards the distance but is not in the grid
+                worker.previously_assigned_shifts.append((roster.spec.start_date - timedelta(days=n % 5 + 1), 'Z'))
+            if n % 4 == 1:
+                worker.incompatible_job = [jobs[n % len(jobs)]]
+        probe = StateProbe()
+        mismatches = []
+
+        def progress(days_done, total_days):
+            # Before each day is scheduled, compare the engine with the reference check on every slot of it
+            if days_done == total_days:
+                return
+            state = probe.state
+            offset = state.horizon.offset(roster.spec.start_date) + days_done
+            date = state.horizon.dates[offset]
+            for job_row, job in enumerate(state.jobs):
+                strict, override = state.constraints.masks(state, offset, job_row)
+                for row, worker in enumerate(state.workers):
+                    has_quota = state.roster_arrays.shift_quota[row] > 0
+                    expected = tuple(has_quota and can_work_on_date(worker, date, job, state.roster_arrays, state.availability, state.group_occupancy,
+                                                                    state.min_distance, state.max_shifts_per_week, override=override_only)
+                                     for override_only in (False, True))
+                    checked.append(expected)
+                    if (bool(strict[row]), bool(override[row])) != expected:
+                        mismatches.append((state.horizon.date_strs[offset], job, worker.identification))
+
+        schedule_shifts(work_periods, holidays, jobs, workers, min_distance, max_shifts_per_week, progress=progress, constraints=[probe])
+        assert not mismatches, mismatches[:5]
+    # Both outcomes of both checks occur, so the comparison is not vacuous
+    assert {True, False} <= {strict for strict, _ in checked}
+    assert {True, False} <= {override for _, override in checked}
+
+def test_padded_job_names_are_incompatible_everywhere():
+    # Job names as they come out of CSV cells, with the padding on either side
+    workers = [Worker('W1', incompatible_job=[' A', '']), Worker('W2', obligatory_coverage=['05/02/2025'], incompatible_job=['B '])]
+    workers += [Worker(f"W{n}") for n in range(3, 9)]
+    schedule = schedule_shifts(['01/02/2025-28/02/2025'], [], ['A ', ' B'], workers, 2, 3)
+    state = schedule.state
+    assert 'W1' not in schedule['A '].values()
+    assert 'W2' not in schedule[' B'].values()
+    assert schedule['A ']['05/02/2025'] == 'W2'
+    for job_row, row in ((0, 0), (1, 1)):
+        assert not state.constraints.placement_masks(state, 10, job_row)[1][row]
+        assert not can_work_on_date(workers[row], state.horizon.dates[10], state.jobs[job_row], state.roster_arrays, state.availability,
+                                    state.group_occupancy, 2, 3, override=True)
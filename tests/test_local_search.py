@@ -0,0 +1,46 @@
+import logging
+
+import numpy as np
+
+from benchmarks.roster_generator import RosterSpec, generate_roster
+from local_search import LocalSearch
+from shift_scheduler import ScheduleGrid, schedule_shifts
+
+logging.disable(logging.CRITICAL)
+
+def _double_booked_schedule():
+    # Too few workers for two jobs, so the override fallback books some of them twice a day
+    schedule = schedule_shifts(*generate_roster(RosterSpec(workers=12, jobs=2, days=90, min_distance=2)).schedule_args())
+    assert (schedule.state.roster_arrays.shift_days > 1).any()
+    return schedule
+
+def test_releasing_one_of_two_shifts_keeps_the_day_occupied():
+    schedule = _double_booked_schedule()
+    state = schedule.state
+    occupied = state.occupancy()
+    row, offset = (int(index[0]) for index in np.nonzero(state.roster_arrays.shift_days > 1))
+    job_rows = np.flatnonzero(state.grid.assignments[:, offset] == row)
+    state.release(occupied, row, offset, int(job_rows[0]))
+    assert occupied[row, offset]
+    state.release(occupied, row, offset, int(job_rows[1]))
+    assert not occupied[row, offset]
+
+def test_double_bookings_count_as_violations_and_trackers_stay_in_step():
+    schedule = _double_booked_schedule()
+    state = schedule.state
+    search = LocalSearch(schedule)
+    # Obligatory shifts are never offered up, so look at a double booking without one
+    rows, offsets = np.nonzero((state.roster_arrays.shift_days > 1) & ~state.availability.obligatory)
+    row, offset = int(rows[0]), int(offsets[0])
+    count, involved = search.violations(row)
+    assert count >= int((state.roster_arrays.shift_days[row] - 1).clip(0).sum())
+    assert offset in involved.tolist()
+
+    before = int((state.roster_arrays.shift_days > 1).sum())
+    search.run(0.5)
+    assert int((state.roster_arrays.shift_days > 1).sum()) < before
+    assert np.array_equal(search.occupied, state.occupancy())
+    filled = search.job_of != ScheduleGrid.EMPTY
+    rows, offsets = np.nonzero(filled)
+    assert (state.grid.assignments[search.job_of[rows, offsets], offsets] == rows).all()
+    assert np.array_equal(filled, state.roster_arrays.shift_days > 0)
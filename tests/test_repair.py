@@ -0,0 +1,112 @@
+import logging
+from datetime import datetime
+
+import numpy as np
+
+from benchmarks.roster_generator import RosterSpec, generate_roster
+from multistart import best_of_schedules
+from schedule_repair import repair_add_worker, repair_remove_worker, repair_worker_dates
+from shift_scheduler import GroupOccupancy, ScheduleGrid, Worker, schedule_shifts
+
+logging.disable(logging.CRITICAL)
+
+def _schedule(workers, jobs=('A', 'B')):
+    return schedule_shifts(['01/02/2025-28/02/2025'], [], list(jobs), workers, 2, 3)
+
+def _shifts(schedule, worker_id):
+    return {(date_str, job) for job in schedule for date_str, assigned in schedule[job].items() if assigned == worker_id}
+
+def test_obligatory_date_already_worked_is_kept():
+    schedule = _schedule([Worker(f"W{n}") for n in range(1, 9)])
+    assert schedule['A']['14/02/2025'] == 'W4'
+    # Covering 13/02 must not free the 14/02 shift as a neighbour, which is obligatory as well
+    repair_worker_dates(schedule, 'W4', obligatory_coverage=['13/02/2025', '14/02/2025'])
+    assert {'13/02/2025', '14/02/2025'} <= {date_str for date_str, _ in _shifts(schedule, 'W4')}
+    worker = schedule.state.workers[schedule.state.grid.worker_index['W4']]
+    assert sorted(date.strftime("%d/%m/%Y") for date in worker.obligatory_coverage_shifts) == ['13/02/2025', '14/02/2025']
+
+def test_obligatory_repair_respects_incompatible_job_and_other_obligatory_shifts():
+    workers = [Worker('W1', obligatory_coverage=['10/02/2025']), Worker('W2', incompatible_job=['A'])] + [Worker(f"W{n}") for n in range(3, 9)]
+    schedule = _schedule(workers)
+    assert schedule['A']['10/02/2025'] == 'W1'
+    repair_worker_dates(schedule, 'W2', obligatory_coverage=['10/02/2025'])
+    assert schedule['A']['10/02/2025'] == 'W1'
+    assert schedule['B']['10/02/2025'] == 'W2'
+    assert 'A' not in {job for _, job in _shifts(schedule, 'W2')}
+
+def test_obligatory_repair_without_a_free_job_leaves_the_date():
+    workers = [Worker('W1', obligatory_coverage=['10/02/2025']), Worker('W2', incompatible_job=['B'])] + [Worker(f"W{n}") for n in range(3, 9)]
+    schedule = _schedule(workers)
+    repair_worker_dates(schedule, 'W2', obligatory_coverage=['10/02/2025'])
+    assert schedule['A']['10/02/2025'] == 'W1'
+    assert schedule['B'].get('10/02/2025') != 'W2'
+
+def _assert_trackers_match_grid(state):
+    arrays = state.roster_arrays
+    horizon = state.horizon
+    num_workers = len(state.workers)
+    job_rows, offsets = np.nonzero(state.grid.assignments != ScheduleGrid.EMPTY)
+    rows = state.grid.assignments[job_rows, offsets]
+    shift_days = np.zeros((num_workers, horizon.num_days), dtype=int)
+    np.add.at(shift_days, (rows, offsets), 1)
+    job_counts = np.zeros((num_workers, len(state.jobs)), dtype=int)
+    np.add.at(job_counts, (rows, job_rows), 1)
+    weekly_counts = np.zeros((num_workers, horizon.num_weeks), dtype=int)
+    np.add.at(weekly_counts, (rows, np.asarray(horizon.week_indices)[offsets]), 1)
+    weekend_counts = np.bincount(rows[np.asarray(horizon.weekend_or_holiday, dtype=bool)[offsets]], minlength=num_workers)
+    assert np.array_equal(arrays.shift_days, shift_days)
+    assert np.array_equal(arrays.job_counts, job_counts)
+    assert np.array_equal(arrays.weekly_counts, weekly_counts)
+    assert np.array_equal(arrays.weekend_counts, weekend_counts)
+    assert np.array_equal(state.group_occupancy.counts, GroupOccupancy.from_grid(state.grid, state.workers).counts)
+    assert np.allclose(arrays.shift_quota, [worker.shift_quota for worker in state.workers])
+    # Without history every shift was assigned by this run
+    assert np.allclose(state.initial_quota - arrays.shift_quota, shift_days.sum(axis=1))
+
+def test_obligatory_coverage_over_a_previous_shift_releases_it():
+    workers = [Worker('W1', previously_assigned_shifts=[(datetime(2025, 2, 10), 'A')]), Worker('W2', obligatory_coverage=['10/02/2025'])]
+    workers += [Worker(f"W{n}") for n in range(3, 9)]
+    schedule = _schedule(workers)
+    assert schedule['A']['10/02/2025'] == 'W2'
+    state = schedule.state
+    offset = state.horizon.offset(datetime(2025, 2, 10))
+    assert state.roster_arrays.shift_days[0, offset] == 0
+    assert state.roster_arrays.shift_days[1, offset] == 1
+
+def test_trackers_match_grid_after_each_repair():
+    for seed in range(3):
+        # Two obligatory dates per worker, so some collide, and no history, which lives outside the grid's count
+        roster = generate_roster(RosterSpec(workers=25, jobs=3, days=90, obligatory_per_worker=2, incompatible_share=0.3,
+                                            partial_availability_share=0.3, seed=seed))
+        schedule = schedule_shifts(*roster.schedule_args())
+        state = schedule.state
+        _assert_trackers_match_grid(state)
+        date_strs = state.horizon.date_strs
+
+        for n, worker_id in enumerate(('W3', 'W7', 'W11')):
+            worked = sorted(date_str for job in schedule for date_str, assigned in schedule[job].items() if assigned == worker_id)
+            repair_worker_dates(schedule, worker_id, unavailable_dates=worked[::2], obligatory_coverage=[date_strs[20 + 9 * n], worked[-1]])
+            _assert_trackers_match_grid(state)
+        repair_worker_dates(schedule, 'W5', work_dates=[(state.horizon.dates[30], state.horizon.dates[60])])
+        _assert_trackers_match_grid(state)
+        repair_remove_worker(schedule, 'W2')
+        _assert_trackers_match_grid(state)
+        repair_add_worker(schedule, Worker('NEW', obligatory_coverage=[date_strs[40], date_strs[41]], incompatible_job=[roster.jobs[0]]))
+        _assert_trackers_match_grid(state)
+
+def test_multistart_schedule_is_bound_to_the_callers_workers():
+    roster = generate_roster(RosterSpec(workers=25, jobs=3, days=90, obligatory_per_worker=2, incompatible_share=0.3,
+                                        partial_availability_share=0.3, seed=1))
+    args = roster.schedule_args()
+    workers = args[3]
+    schedule, _, scores = best_of_schedules(*args, starts=4, processes=1)
+    # The winner ran on a shuffled copy of the roster
+    assert min(scores, key=lambda score: score['total']) is not scores[0]
+    state = schedule.state
+    assert all(bound is worker for bound, worker in zip(state.workers, workers)) and len(state.workers) == len(workers)
+    assert state.grid.worker_ids == [worker.identification for worker in workers]
+    _assert_trackers_match_grid(state)
+    worked = sorted(date_str for job in schedule for date_str, assigned in schedule[job].items() if assigned == 'W3')
+    repair_worker_dates(schedule, 'W3', unavailable_dates=worked[:2])
+    _assert_trackers_match_grid(state)
+    assert next(worker for worker in workers if worker.identification == 'W3').unavailable_dates == worked[:2]
@@ -0,0 +1,36 @@
+import logging
+
+import pytest
+
+from benchmarks.roster_generator import RosterSpec, generate_roster
+from rolling_horizon import schedule_rolling
+from shift_scheduler import SchedulingCancelled
+
+logging.disable(logging.CRITICAL)
+
+def test_resumed_run_matches_an_uninterrupted_one(tmp_path):
+    roster = generate_roster(RosterSpec(workers=30, jobs=2, days=180, obligatory_per_worker=1, seed=4))
+    work_periods, holidays, jobs, _, min_distance, max_shifts_per_week = roster.schedule_args()
+    calls = []
+    def counting():
+        calls.append(None)
+        return False
+    full = schedule_rolling(work_periods, holidays, jobs, roster.workers(), min_distance, max_shifts_per_week,
+                            str(tmp_path / 'full.csv'), window_days=30, cancelled=counting)
+    assert full['windows'] > 2
+
+    # Stop halfway through, inside a window past the first
+    stop_at = len(calls) // 2
+    calls.clear()
+    def cancelled():
+        calls.append(None)
+        return len(calls) == stop_at
+    checkpoint = str(tmp_path / 'checkpoint.json')
+    with pytest.raises(SchedulingCancelled):
+        schedule_rolling(work_periods, holidays, jobs, roster.workers(), min_distance, max_shifts_per_week,
+                         str(tmp_path / 'resumed.csv'), checkpoint=checkpoint, window_days=30, cancelled=cancelled)
+    resumed = schedule_rolling(work_periods, holidays, jobs, roster.workers(), min_distance, max_shifts_per_week,
+                               str(tmp_path / 'resumed.csv'), checkpoint=checkpoint, window_days=30)
+    assert 0 < resumed['resumed_windows'] < full['windows']
+    assert resumed['shifts'] == full['shifts']
+    assert (tmp_path / 'resumed.csv').read_bytes() == (tmp_path / 'full.csv').read_bytes()
@@ -0,0 +1,75 @@
+import logging
+import os
+
+import schedule_cache
+from schedule_cache import ScheduleCache
+from shift_scheduler import Worker
+
+logging.disable(logging.CRITICAL)
+
+PERIODS = ['01/02/2025-28/02/2025']
+
+def _workers():
+    return [Worker('W1', obligatory_coverage=['05/02/2025'])] + [Worker(f"W{n}") for n in range(2, 9)]
+
+def _assignments(schedule):
+    return sorted((job, date_str, worker_id) for job in schedule for date_str, worker_id in schedule[job].items())
+
+def _counting_runs(monkeypatch):
+    runs = []
+    original = schedule_cache.schedule_shifts
+    def schedule_shifts(*args, **kwargs):
+        runs.append(kwargs.get('seed_assignments'))
+        return original(*args, **kwargs)
+    monkeypatch.setattr(schedule_cache, 'schedule_shifts', schedule_shifts)
+    return runs
+
+def test_same_workers_twice_is_a_hit(tmp_path, monkeypatch):
+    runs = _counting_runs(monkeypatch)
+    cache = ScheduleCache(str(tmp_path))
+    workers = _workers()
+    first = cache.schedule_shifts(PERIODS, [], ['A', 'B'], workers, 2, 3)
+    # The run filled the workers' empty work dates in; they still hash the same
+    second = cache.schedule_shifts(PERIODS, [], ['A', 'B'], workers, 2, 3)
+    third = cache.schedule_shifts(PERIODS, [], ['A', 'B'], _workers(), 2, 3)
+    assert len(runs) == 1
+    assert _assignments(first) == _assignments(second) == _assignments(third)
+    assert second['A']['05/02/2025'] == 'W1'
+
+def test_unreadable_entry_is_a_miss(tmp_path, monkeypatch):
+    runs = _counting_runs(monkeypatch)
+    cache = ScheduleCache(str(tmp_path))
+    expected = _assignments(cache.schedule_shifts(PERIODS, [], ['A', 'B'], _workers(), 2, 3))
+    for name in os.listdir(tmp_path):
+        if name.startswith('schedule-'):
+            # A pickle whose class no longer exists, as left by an older version of the code
+            with open(tmp_path / name, 'wb') as file:
+                file.write(b'cshift_scheduler\nGone\n.')
+    assert _assignments(cache.schedule_shifts(PERIODS, [], ['A', 'B'], _workers(), 2, 3)) == expected
+    assert len(runs) == 2
+
+def test_eviction_drops_least_recently_used_entries(tmp_path):
+    cache = ScheduleCache(str(tmp_path))
+    cache.schedule_shifts(PERIODS, [], ['A', 'B'], _workers(), 2, 3)
+    one_run = sum(os.path.getsize(tmp_path / name) for name in os.listdir(tmp_path))
+    cache.max_bytes = int(one_run * 1.5)
+    cache.schedule_shifts(['01/03/2025-31/03/2025'], [], ['A', 'B'], _workers(), 2, 3)
+    names = os.listdir(tmp_path)
+    assert sum(os.path.getsize(tmp_path / name) for name in names) <= cache.max_bytes
+    # The February schedule was the oldest entry; the March one was just written
+    key = schedule_cache.request_key(['01/03/2025-31/03/2025'], [], ['A', 'B'], _workers(), 2, 3)
+    assert f"schedule-{key}.pkl" in names
+    assert len([name for name in names if name.startswith('schedule-')]) == 1
+
+def test_seeded_results_are_never_served_to_exact_requests(tmp_path, monkeypatch):
+    runs = _counting_runs(monkeypatch)
+    cache = ScheduleCache(str(tmp_path))
+    cache.schedule_shifts(PERIODS, [], ['A', 'B'], _workers(), 2, 3)
+    longer = ['01/02/2025-31/03/2025']
+    seeded = cache.schedule_shifts(longer, [], ['A', 'B'], _workers(), 2, 3, reuse_prefix=True)
+    assert runs[-1]
+    assert cache.schedule_shifts(longer, [], ['A', 'B'], _workers(), 2, 3, reuse_prefix=True) is not None
+    assert len(runs) == 2
+    exact = cache.schedule_shifts(longer, [], ['A', 'B'], _workers(), 2, 3)
+    assert len(runs) == 3 and runs[-1] is None
+    assert len(_assignments(exact)) == len(_assignments(seeded))
@@ -0,0 +1,64 @@
+import csv
+import gzip
+import logging
+from datetime import datetime
+
+from benchmarks.roster_generator import CSV_HEADERS, RosterSpec, generate_roster
+from shift_scheduler import Worker, export_schedule_to_csv, import_workers_from_csv, schedule_shifts
+
+logging.disable(logging.CRITICAL)
+
+def _assignments(schedule):
+    return sorted((job, date_str, worker_id) for job in schedule for date_str, worker_id in schedule[job].items())
+
+def test_second_run_on_the_same_workers_covers_obligatory_dates_again():
+    roster = generate_roster(RosterSpec(workers=60, jobs=3, days=90, obligatory_per_worker=2, seed=3))
+    args = roster.schedule_args()
+    first = _assignments(schedule_shifts(*args))
+    second = schedule_shifts(*args)
+    assert _assignments(second) == first
+    for worker in args[3]:
+        covered = {date.strftime("%d/%m/%Y") for date in worker.obligatory_coverage_shifts}
+        assert covered == {date_str for date_str in worker.obligatory_coverage
+                           if any(second[job].get(date_str) == worker.identification for job in second)}
+
+def test_obligatory_date_listed_twice_gets_one_shift():
+    workers = [Worker('W1', obligatory_coverage=['05/02/2025', '05/02/2025'])] + [Worker(f"W{n}") for n in range(2, 8)]
+    schedule = schedule_shifts(['01/02/2025-28/02/2025'], [], ['A', 'B'], workers, 2, 3)
+    assert schedule['A']['05/02/2025'] == 'W1'
+    assert schedule['B']['05/02/2025'] != 'W1'
+    # A rerun on the same objects keeps the date
+    schedule = schedule_shifts(['01/02/2025-28/02/2025'], [], ['A', 'B'], workers, 2, 3)
+    assert schedule['A']['05/02/2025'] == 'W1'
+
+def test_bad_obligatory_or_unavailable_date_fails_only_its_row(tmp_path):
+    path = tmp_path / 'roster.csv'
+    with open(path, 'w', newline='') as file:
+        writer = csv.writer(file)
+        writer.writerow(CSV_HEADERS)
+        writer.writerow(['W1', '', '100', '1', '', '', '32/01/2025', '', '', ''])
+        writer.writerow(['W2', '', '100', '1', '', '', '', '03/02/2025, 31/02/2025', '', ''])
+        for n in range(3, 9):
+            writer.writerow([f"W{n}", '', '100', '1', '', '', '05/02/2025' if n == 3 else '', ' 06/02/2025 ,', '', ''])
+    errors = []
+    workers = import_workers_from_csv(str(path), on_error=lambda row_number, row, error: errors.append((row_number, str(error))))
+    assert errors == [(2, "invalid date '32/01/2025'"), (3, "invalid date '31/02/2025'")]
+    assert [worker.identification for worker in workers] == [f"W{n}" for n in range(3, 9)]
+    assert workers[0].obligatory_coverage == ['05/02/2025']
+    assert workers[0].unavailable_dates == ['06/02/2025']
+    schedule = schedule_shifts(['01/02/2025-28/02/2025'], [], ['A'], workers, 2, 3)
+    assert schedule['A']['05/02/2025'] == 'W3'
+
+def test_exported_schedule_reads_back_as_shift_history(tmp_path):
+    workers = [Worker(f"W{n}", group='2' if n % 2 else '1') for n in range(1, 9)]
+    schedule = schedule_shifts(['01/02/2025-28/02/2025'], ['14/02/2025'], ['A', 'B'], workers, 2, 3)
+    expected = {worker.identification: sorted((datetime.strptime(date_str, "%d/%m/%Y"), job) for job, date_str, worker_id in _assignments(schedule)
+                                              if worker_id == worker.identification)
+                for worker in workers}
+    for name in ('schedule.csv', 'schedule.csv.gz'):
+        export_schedule_to_csv(schedule, str(tmp_path / name), workers, ['14/02/2025'])
+        imported = import_workers_from_csv(str(tmp_path / name))
+        assert {worker.identification: sorted(worker.previously_assigned_shifts) for worker in imported} == expected
+        assert {worker.identification: worker.group for worker in imported} == {worker.identification: worker.group for worker in workers}
+    with gzip.open(tmp_path / 'schedule.csv.gz', 'rb') as file:
+        assert file.read() == (tmp_path / 'schedule.csv').read_bytes()
@@ -1,49 +1,47 @@
+import sys
 from datetime import datetime
 
 class Worker:
-    def __init__(self, identification, work_dates=None, percentage=100.0, group='1', incompatible_job=None, group_incompatibility=None, obligatory_coverage=None, unavailable_dates=None):
-        if work_dates:
-            self.work_dates = [(datetime.strptime(start.strip(), "%d/%m/%Y"), datetime.strptime(end.strip(), "%d/%m/%Y")) for period in work_dates if '-' in period for start, end in [period.split('-')]]
-        else:
-            self.work_dates = []
-        self.identification = identification
+    """One roster entry; the scheduler reads its dates and writes back its quota and obligatory shifts.
+
+    __slots__ keeps large rosters small and cheap to copy, and the
+    identification is interned so the many id-keyed lookups of a run
+    compare by identity.
+    """
+    __slots__ = ('identification', 'work_dates', 'percentage_shifts', 'group', 'incompatible_job', 'group_incompatibility',
+                 'obligatory_coverage', 'unavailable_dates', 'previously_assigned_shifts', 'obligatory_coverage_shifts',
+                 'shift_quota', 'weekly_shift_quota', 'has_exception')
+
+    def __init__(self, identification, work_dates=None, percentage=100.0, group='1', incompatible_job=None, group_incompatibility=None, obligatory_coverage=None, unavailable_dates=None, previously_assigned_shifts=None):
+        self.identification = sys.intern(str(identification))
+        self.work_dates = work_dates if work_dates else []
         self.percentage_shifts = float(percentage) if percentage else 100.0
-        self.group = group if group else '1'
+        self.group = sys.intern(group) if group else '1'
         self.incompatible_job = incompatible_job if incompatible_job else []
         self.group_incompatibility = group_incompatibility if group_incompatibility else []
         self.obligatory_coverage = obligatory_coverage if obligatory_coverage else []
-        self.obligatory_coverage_shifts = {}  # Add this line to track obligatory coverage shifts
         self.unavailable_dates = unavailable_dates if unavailable_dates else []
-
+        self.previously_assigned_shifts = previously_assigned_shifts if previously_assigned_shifts else []
+        self.obligatory_coverage_shifts = {}
         self.shift_quota = 0
         self.weekly_shift_quota = 0
-        self.has_exception = False  # Add this line to track exceptions
-
-
-    def __lt__(self, other):
-        return (self.shift_quota, self.identification) < (other.shift_quota, other.identification)
-
-    def __le__(self, other):
-        return (self.shift_quota, self.identification) <= (other.shift_quota, other.identification)
-
-    def __eq__(self, other):
-        return (self.shift_quota, self.identification) == (other.shift_quota, other.identification)
-
-@staticmethod
-def from_user_input(identification, working_dates, percentage_shifts, group, position_incompatibility,
-                    group_incompatibility, obligatory_coverage, unavailable_dates):
-    working_dates = [(datetime.strptime(start.strip(), "%d/%m/%Y"), datetime.strptime(end.strip(), "%d/%m/%Y")) 
-                     for date in working_dates.split(',') if '-' in date 
-                     for start, end in [date.split('-')]]
-    position_incompatibility = position_incompatibility.split(',') if position_incompatibility else []
-    group_incompatibility = group_incompatibility.split(',') if group_incompatibility else []
-    obligatory_coverage = [datetime.strptime(date.strip(), "%d/%m/%Y") for date in obligatory_coverage.split(',') if date]
-    unavailable_dates = [datetime.strptime(date.strip(), "%d/%m/%Y") for date in unavailable_dates.split(',') if date]
-    return Worker(identification, working_dates, percentage_shifts, group, position_incompatibility,
-                  group_incompatibility, obligatory_coverage, unavailable_dates)
-
-
-
-  
-
-
+        self.has_exception = False
+
+    def is_incompatible_with(self, job):
+        """True if the worker may not take job; names are compared without surrounding whitespace, as typed in CSV cells."""
+        job = job.strip()
+        return any(job == incompatible.strip() for incompatible in self.incompatible_job if incompatible.strip())
+
+    @classmethod
+    def from_user_input(cls, identification, working_dates, percentage_shifts, group, position_incompatibility,
+                        group_incompatibility, obligatory_coverage, unavailable_dates):
+        """Build a worker from the comma-separated text fields of a form."""
+        working_dates = [(datetime.strptime(start.strip(), "%d/%m/%Y"), datetime.strptime(end.strip(), "%d/%m/%Y"))
+                         for date in working_dates.split(',') if '-' in date
+                         for start, end in [date.split('-')]]
+        position_incompatibility = position_incompatibility.split(',') if position_incompatibility else []
+        group_incompatibility = group_incompatibility.split(',') if group_incompatibility else []
+        obligatory_coverage = [date.strip() for date in obligatory_coverage.split(',') if date.strip()] if obligatory_coverage else []
+        unavailable_dates = [date.strip() for date in unavailable_dates.split(',') if date.strip()] if unavailable_dates else []
+        return cls(identification, working_dates, percentage_shifts, group, position_incompatibility,
+                   group_incompatibility, obligatory_coverage, unavailable_dates)